@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
-from src.api.main import app, jobs
+from src.api.main import app, evaluations, jobs
+from src.evaluation.models import TranslationScore
 
 job_id = "api-check"
 jobs.create(job_id, "input.srt", "output.srt", 10)
@@ -8,4 +9,16 @@ response = client.get(f"/jobs/{job_id}")
 assert response.status_code == 200
 assert response.json()["total"] == 10
 assert client.post(f"/jobs/{job_id}/cancel").json()["status"] == "cancelled"
+# Without a stored request the queue would never pick the job up again.
+assert client.post(f"/jobs/{job_id}/resume").status_code == 409
+evaluations.connection().execute("DELETE FROM evaluations WHERE job_id=?", (job_id,))
+evaluations.save_many({0: TranslationScore(9.0, True, [], []), 1: TranslationScore(8.5, True, [], []), 2: TranslationScore(4.0, False, ["Wrong name"], [])}, job_id, "judge", 0.5)
+quality = client.get(f"/jobs/{job_id}/quality").json()
+assert (quality["evaluated"], quality["passed"], quality["failed"], quality["average_score"]) == (3, 2, 1, 7.17)
+assert quality["histogram"] == [{"score": 4, "count": 1}, {"score": 8, "count": 1}, {"score": 9, "count": 1}]
+assert quality["failures"] == [{"unit_id": 2, "score": 4.0, "issues": ["Wrong name"], "model": "judge"}]
+assert client.get("/jobs/missing/quality").status_code == 404
+# A negative limit would reach SQLite as LIMIT -1 and return every failure.
+assert client.get(f"/jobs/{job_id}/quality?failures=-1").status_code == 422
+assert client.get(f"/jobs/{job_id}/quality?failures=0").json()["failures"] == []
 print("api check passed")
@@ -53,7 +53,8 @@ with st.form("easy_translation_form"):
         custom_model = st.text_input("Use a model name not shown above (optional)", "")
         batch_size = st.slider("Processing batch size", 1, 100, 20)
         max_workers = st.slider("Parallel workers", 1, 8, 1)
-        quality_mode = st.selectbox("Quality checking", ["disabled", "standard", "strict"], index=1)
+        adaptive_workers = st.checkbox("Tune parallel workers automatically (up to the number above)", False)
+        quality_mode = st.selectbox("Quality checking", ["disabled", "fast", "sampled", "standard", "strict"], index=3)
         glossary_enabled = st.checkbox("Use the built-in terminology glossary", True)
 
     submitted = st.form_submit_button("🚀 Translate subtitles", type="primary", disabled=uploaded is None, use_container_width=True)
@@ -64,6 +65,7 @@ if submitted and uploaded:
         "source_language": "auto", "target_language": "fa", "provider": provider,
         "model": model, "base_url": base_url, "api_key": api_key,
         "batch_size": batch_size, "max_workers": max_workers,
+        "concurrency_mode": "adaptive" if adaptive_workers else "async",
         "quality_mode": quality_mode, "glossary_enabled": glossary_enabled,
     })
     try:
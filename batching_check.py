@@ -0,0 +1,56 @@
+import asyncio
+import json
+from src.translation.batching import TokenBudgetBatcher, context_tokens, estimate_tokens
+from src.translation.engine import SubtitleTranslator
+from src.translation.models import TranslationContext, TranslationUnit
+
+short = [TranslationUnit(i, "Yeah.") for i in range(40)]
+long = [TranslationUnit(i, "Morty, you have to listen to me very carefully, this is important. " * 4) for i in range(40)]
+batcher = TokenBudgetBatcher(token_budget=1000, max_units=20)
+assert [len(batch) for batch in batcher.pack(short)] == [20, 20]
+packed = batcher.pack(long)
+assert len(packed) > 2 and all(sum(estimate_tokens(unit) for unit in batch) <= 1000 for batch in packed)
+ready, held = batcher.take(short[:30])
+assert [len(batch) for batch in ready] == [20] and len(held) == 10
+# A trailing batch that is already full is sent instead of waiting for the next chunk.
+ready, held = batcher.take(short[:20])
+assert [len(batch) for batch in ready] == [20] and held == []
+ready, held = TokenBudgetBatcher(token_budget=sum(estimate_tokens(unit) for unit in long[:3]), max_units=20).take(long[:3])
+assert [len(batch) for batch in ready] == [3] and held == []
+batcher.record_failure(20)
+batcher.record_success()
+batcher.record_failure(20)
+assert batcher.max_units == 20
+batcher.record_failure(20)
+assert batcher.max_units == 10 and [len(batch) for batch in batcher.pack(short)] == [10, 10, 10, 10]
+
+
+class Provider:
+    # Fails validation for any batch larger than four lines, like a small-context model.
+    sizes = []
+    def chat(self, messages, temperature=0.2):
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        Provider.sizes.append(len(items))
+        if len(items) > 4:
+            return "[]"
+        return json.dumps([{"id": x["id"], "translation": "آره"} for x in items], ensure_ascii=False)
+
+
+translator = SubtitleTranslator(batch_size=8, max_retries=0, context_mode="none")
+batcher = TokenBudgetBatcher(max_units=8)
+for start in (0, 8):
+    result = asyncio.run(translator._translate_batch(short[start:start + 8], Provider(), batcher))
+    assert len(result) == 8
+# Only the second whole-batch failure in a row shrinks the batch size.
+assert batcher.max_units == 4
+Provider.sizes.clear()
+asyncio.run(translator._translate_batch(short[16:24], Provider(), batcher))
+# Later batches are re-packed to the learned size instead of failing again.
+assert Provider.sizes == [4, 4]
+
+windowed = [TranslationUnit(i, "Yeah.", TranslationContext([f"before {i}"] * 3, "Yeah.", [f"after {i}"] * 3)) for i in range(10)]
+assert context_tokens(windowed[0], windowed[9]) == (3 * len("before 0") + 3 * len("after 9")) // 4
+budget = sum(estimate_tokens(unit) for unit in windowed) + context_tokens(windowed[0], windowed[9])
+assert [len(batch) for batch in TokenBudgetBatcher(budget, 20).pack(windowed)] == [10]
+assert len(TokenBudgetBatcher(budget - 1, 20).pack(windowed)) == 2
+print("token budget batching check passed")
@@ -13,4 +13,11 @@ with tempfile.TemporaryDirectory() as directory:
     # A restarted worker skips 0 and 1 and only processes unit 2.
     remaining = [i for i in range(3) if i not in restored]
     assert remaining == [2]
+    db.save_checkpoints("job", {1: "two!", 2: "three"})
+    assert db.get("job")["completed_units"] == 3
+    db.create("batched", "movie.srt", "movie.fa.srt", 40)
+    for start in range(0, 40, 10):
+        db.writer.submit("batched", {unit: f"line {unit}" for unit in range(start, start + 10)})
+    db.writer.flush("batched")
+    assert db.get("batched")["completed_units"] == 40 and len(db.checkpoints("batched")) == 40
 print("checkpoint check passed")
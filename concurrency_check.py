@@ -0,0 +1,102 @@
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import httpx
+from ollama import ResponseError
+from src.subtitle_engine import SubtitleDocument
+from src.translation import engine
+from src.translation.batching import estimate_tokens
+from src.translation.engine import SubtitleTranslator
+from src.translation.workers import AdaptiveLimiter
+
+
+def saturate(limiter, capacity, rounds=200):
+    # A provider that serves `capacity` requests at once and queues the rest; each round
+    # runs as many calls as the limit allows and reports their latency.
+    peak = 0
+    for _ in range(rounds):
+        active = int(limiter.limit)
+        peak = max(peak, active)
+        for _ in range(active):
+            limiter.observe(0.02 * max(1, active / capacity))
+    return peak
+
+
+limiter = AdaptiveLimiter(16)
+assert saturate(limiter, capacity=2) < 16 and limiter.limit < 6
+limiter = AdaptiveLimiter(8)
+assert saturate(limiter, capacity=32) == 8 and limiter.limit == 8
+limiter.observe(1.0, failed=True)
+assert limiter.limit == 4
+
+
+class Provider:
+    def chat(self, messages, temperature=0.2):
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(50)), encoding="utf-8")
+    result = SubtitleTranslator(batch_size=5, max_workers=4, concurrency_mode="adaptive", context_mode="none").translate_document(SubtitleDocument.load(path), Provider())
+    assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(50)]
+
+
+class FlakyProvider(Provider):
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def achat(self, messages, temperature=0.2):
+        self.calls += 1
+        if self.calls == 1:
+            if self.error:
+                raise self.error
+            return "not json"
+        return self.chat(messages, temperature)
+
+
+async def translate(provider, limiter):
+    translator = SubtitleTranslator(context_mode="none")
+    units = translator.extract_units(SubtitleDocument.load(path))
+    return await translator._translate_batch(units[:4], provider, limiter=limiter)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "four.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(4)), encoding="utf-8")
+    # Validation retries and transient provider errors both back the limiter off.
+    for error in (None, httpx.ConnectError("refused"), ResponseError("overloaded", 503)):
+        limiter = AdaptiveLimiter(8, initial=8)
+        assert asyncio.run(translate(FlakyProvider(error), limiter)) == {i: f"T{i}" for i in range(4)}
+        assert limiter.baseline is not None and limiter.limit == 4 + 1 / 4
+    # Only the provider call is timed, per estimated token of the batch.
+    clock = [0.0]
+
+    class SlowProvider(Provider):
+        async def achat(self, messages, temperature=0.2):
+            clock[0] += 2.0
+            return self.chat(messages, temperature)
+
+    class RecordingLimiter(AdaptiveLimiter):
+        def observe(self, latency, failed=False):
+            observed.append((latency, failed))
+
+    observed = []
+    engine.time = SimpleNamespace(monotonic=lambda: clock[0], perf_counter=time.perf_counter)
+    asyncio.run(translate(SlowProvider(), RecordingLimiter(8)))
+    engine.time = time
+    units = SubtitleTranslator(context_mode="none").extract_units(SubtitleDocument.load(path))
+    assert observed == [(2.0 / sum(estimate_tokens(unit) for unit in units), False)]
+    # Errors that a retry cannot fix still fail the batch at once.
+    provider = FlakyProvider(ResponseError("model not found", 404))
+    try:
+        asyncio.run(translate(provider, AdaptiveLimiter(8)))
+        raise AssertionError("a 404 must not be retried")
+    except ResponseError:
+        assert provider.calls == 1
+print("adaptive concurrency check passed")
@@ -0,0 +1,35 @@
+import json
+import tempfile
+from pathlib import Path
+from src.jobs.database import JobDatabase
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+
+
+class Provider:
+    def __init__(self):
+        self.units = 0
+
+    def chat(self, messages, temperature=0.2):
+        payload = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        self.units += len(payload["items"])
+        return json.dumps([{"id": x["id"], "translation": "T:" + " ".join(payload["lines"][x["line"]].split())} for x in payload["items"]])
+
+
+document = SubtitleDocument.load("samples/Rick_and_Morty_S01E01.srt")
+expected = ["T:" + " ".join(line.text.split()) for line in document.subtitles]
+sent = {}
+for mode in ("off", "context", "text"):
+    provider = Provider()
+    result = SubtitleTranslator(batch_size=40, deduplicate=mode).translate_document(document, provider)
+    assert [line.text for line in result.subtitles] == expected
+    sent[mode] = provider.units
+assert sent["off"] == len(document.subtitles) >= sent["context"] > sent["text"]
+assert sent["text"] == len({" ".join(line.text.split()) for line in document.subtitles})
+
+with tempfile.TemporaryDirectory() as directory:
+    jobs = JobDatabase(Path(directory) / "jobs.db")
+    SubtitleTranslator(batch_size=40).translate_document(document, Provider(), job_id="dedup", job_database=jobs)
+    # Every occurrence is checkpointed, not just the line that was sent.
+    assert jobs.get("dedup")["completed_units"] == len(document.subtitles) == len(jobs.checkpoints("dedup"))
+print(f"deduplication check passed ({sent['off']} -> {sent['text']} lines sent)")
@@ -0,0 +1,62 @@
+"""Compare the JSON and id|translation response formats against a real provider.
+
+Example: python format_benchmark.py samples/Rick_and_Morty_S01E01.srt --provider ollama --model gemma3
+"""
+import argparse
+import asyncio
+import re
+import time
+from src.providers import LMStudioProvider, OllamaProvider, OpenAICompatibleProvider
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.prompts import batch_messages
+from src.translation.validator import parse_translations
+from src.providers.base import achat
+
+
+def rough_tokens(text):
+    # Words and individual punctuation marks: close enough to compare two formats.
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+async def measure(translator, units, provider, response_format, batches):
+    calls = tokens = seconds = failures = 0
+    for start in range(0, min(len(units), batches * translator.batch_size), translator.batch_size):
+        batch = units[start:start + translator.batch_size]
+        started = time.perf_counter()
+        raw = await achat(provider, batch_messages(batch, response_format), temperature=0.2)
+        seconds += time.perf_counter() - started
+        calls += 1
+        tokens += rough_tokens(raw)
+        try:
+            parse_translations(raw, [unit.id for unit in batch], response_format)
+        except ValueError:
+            failures += 1
+    return calls, tokens, seconds, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("subtitle")
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "lm studio", "openai-compatible"])
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--base-url", default="http://localhost:1234/v1")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--batches", type=int, default=5)
+    args = parser.parse_args()
+    if args.provider == "ollama":
+        provider = OllamaProvider(args.model)
+    elif args.provider == "lm studio":
+        provider = LMStudioProvider(args.model, args.base_url)
+    else:
+        provider = OpenAICompatibleProvider(args.model, args.base_url, args.api_key)
+    translator = SubtitleTranslator(batch_size=args.batch_size)
+    units = translator.extract_units(SubtitleDocument.load(args.subtitle))
+    for response_format in ("json", "lines"):
+        calls, tokens, seconds, failures = asyncio.run(measure(translator, units, provider, response_format, args.batches))
+        print(f"{response_format:>5}: {tokens / calls:7.1f} output tokens/batch  {seconds / calls:6.2f} s/batch  {failures}/{calls} invalid")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,56 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from src.glossary.service import GlossaryService
 from src.glossary.models import GlossaryEntry
+from src.glossary.matcher import GlossaryMatcher
+from src.glossary.registry import GlossaryRegistry
 
 service = GlossaryService([GlossaryEntry("Force", "نیرو", case_sensitive=True), GlossaryEntry("John Wick", "جان ویک")])
 assert [x.target for x in service.find_terms("The Force is strong.")] == ["نیرو"]
 assert {x.target for x in service.find_terms("John Wick uses the Force.")} == {"جان ویک", "نیرو"}
 assert service.find_terms("force of gravity") == []
+assert [x.target for x in service.find_terms("JOHN WICK and the Force")] == ["نیرو", "جان ویک"]
+
+entries = [GlossaryEntry("Rick", "ریک"), GlossaryEntry("ick", "ایک"), GlossaryEntry("Straße", "خیابان"), GlossaryEntry("Σίσυφος", "سیزیف")]
+service = GlossaryService(entries)
+assert [x.target for x in service.find_terms("Pickle RICK!")] == ["ریک", "ایک"]
+assert [x.target for x in service.find_terms("STRASSE ΣΊΣΥΦΟΣ")] == ["سیزیف"]
+assert [x.target for x in GlossaryService(entries, word_boundaries=True).find_terms("Pickle Rick, sick")] == ["ریک"]
+matcher = GlossaryMatcher(entries, memo_size=2)
+assert matcher.find("rick") == matcher.find("rick") == entries[:2] and len(matcher._memo) == 1
+# Lookups from several threads keep evicting each other's memo entries without raising.
+with ThreadPoolExecutor(8) as pool:
+    assert all(found == entries[:2] for found in pool.map(matcher.find, ["rick"] * 2000 + ["Rick"] * 2000))
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "glossary.json"
+    path.write_text(json.dumps([{"source": "Morty", "target": "مورتی"}]), encoding="utf-8")
+    registry = GlossaryRegistry(poll_interval=0)
+    snapshot = registry.get(path)
+    assert registry.get(str(path)) is snapshot and [x.target for x in snapshot.find_terms("Morty!")] == ["مورتی"]
+    os.utime(path, ns=(1, 1))
+    registry.refresh()
+    assert registry.get(path) is snapshot
+    for content in ("[{", json.dumps([{"source": "Morty", "target": "مورتیِ"}, {"source": "Rick", "target": "ریک"}])):
+        path.write_text(content, encoding="utf-8")
+        os.utime(path, ns=(2, len(content)))
+        registry.refresh()
+    # Jobs keep the snapshot they started with; new lookups see the edited file.
+    assert [x.target for x in snapshot.find_terms("Rick and Morty")] == ["مورتی"]
+    assert [x.target for x in registry.get(path).find_terms("Rick and Morty")] == ["مورتیِ", "ریک"]
+    watched = GlossaryRegistry(poll_interval=0.01)
+    watched.get(path)
+    path.write_text(json.dumps([{"source": "Rick", "target": "ریکِ"}]), encoding="utf-8")
+    os.utime(path, ns=(3, 3))
+    for _ in range(200):
+        if [x.target for x in watched.get(path).find_terms("Rick")] == ["ریکِ"]:
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("glossary was not reloaded")
+    watched.close()
 print("glossary check passed")
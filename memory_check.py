@@ -10,7 +10,7 @@ class Provider:
     calls = 0
     def chat(self, messages, temperature=0.2):
         Provider.calls += 1
-        items = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
         return json.dumps([{"id": x["id"], "translation": "سلام"} for x in items], ensure_ascii=False)
 
 
@@ -19,10 +19,17 @@ with tempfile.TemporaryDirectory() as directory:
     memory = TranslationMemory(db, source_lang="en", target_lang="fa")
     memory.save("Hello", "سلام")
     assert memory.lookup("hello") == "سلام"
+    memory.save("Where are we going, Rick?", "کجا داریم میریم، ریک؟")
+    assert memory.lookup("Where are we going Rick?") == "کجا داریم میریم، ریک؟"
+    assert memory.lookup("Where are you going, Morty?") is None
+    assert memory.lookup_many(["HELLO", "Where are we going Rick?", "Goodbye"], [["سلام"], ["مورتی"], None]) == ["سلام", None, None]
     source = Path(directory) / "one.srt"
     source.write_text("1\n00:00:01,000 --> 00:00:02,000\nHello\n", encoding="utf-8")
     document = SubtitleDocument.load(source)
     translator = SubtitleTranslator(memory=memory, context_mode="none")
     translator.translate_document(document, Provider())
     assert Provider.calls == 0
+    # Per-job memories can share one database and still keep their language pairs apart.
+    shared = TranslationMemory(database=memory.database, source_lang="en", target_lang="de")
+    assert shared.database is memory.database and shared.lookup("Hello") is None
 print("translation memory check passed")
@@ -10,7 +10,7 @@ class Provider:
     calls = 0
     def chat(self, messages, temperature=0.2):
         Provider.calls += 1
-        items = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
         time.sleep(0.01)
         return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
 
@@ -0,0 +1,29 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from src.jobs.database import JobDatabase
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+
+
+class Provider:
+    def __init__(self, jobs):
+        self.jobs, self.progress = jobs, []
+    def chat(self, messages, temperature=0.2):
+        self.progress.append(self.jobs.get("pipeline")["completed_units"])
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        time.sleep(0.05)
+        return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(30)), encoding="utf-8")
+    jobs = JobDatabase(Path(directory) / "jobs.db")
+    provider = Provider(jobs)
+    SubtitleTranslator(batch_size=10, context_mode="none").translate_document(SubtitleDocument.load(path), provider, "pipeline", job_database=jobs)
+    # Finished batches are checkpointed while later batches are still being translated.
+    assert provider.progress[0] == 0 and provider.progress[-1] >= 10
+    assert jobs.get("pipeline")["status"] == "completed" and jobs.get("pipeline")["completed_units"] == 30
+print("pipeline check passed")
@@ -1,6 +1,11 @@
 import json
+import tempfile
+from pathlib import Path
+from src.evaluation.database import EvaluationDatabase
 from src.evaluation.judge import TranslationJudge
+from src.evaluation.heuristics import screen_translation
 from src.evaluation.models import TranslationScore
+from src.translation.engine import SubtitleTranslator
 
 
 class JudgeProvider:
@@ -15,3 +20,55 @@ assert good.passed and good.score > 8
 bad = TranslationJudge(JudgeProvider(4, False, ["Glossary violation"])).evaluate("John Wick", "یوحنا ویک", glossary=["جان ویک"])
 assert not bad.passed and bad.issues
 print("quality judge check passed")
+
+
+class BatchJudgeProvider:
+    def __init__(self):
+        self.calls = []
+    def chat(self, messages, temperature=0.0):
+        payload = json.loads(messages[-1]["content"])
+        self.calls.append(payload)
+        if isinstance(payload, dict):
+            return json.dumps({"score": 8, "passed": True, "issues": [], "suggestions": []})
+        # Item 2 is dropped, item 3 has an out-of-range score and item 9 was never asked for.
+        return json.dumps([
+            {"id": 1, "score": 9, "passed": True, "issues": [], "suggestions": []},
+            {"id": 3, "score": 11, "passed": True, "issues": [], "suggestions": []},
+            {"id": 4, "score": 5, "passed": True, "issues": ["Too literal"], "suggestions": []},
+            {"id": 9, "score": 9, "passed": True, "issues": [], "suggestions": []},
+        ])
+
+
+provider = BatchJudgeProvider()
+scores = TranslationJudge(provider).evaluate_batch([{"id": i, "source": f"Line {i}", "translation": f"T{i}"} for i in range(1, 5)])
+assert sorted(scores) == [1, 2, 3, 4] and len(provider.calls) == 3
+assert scores[1].score == 9 and scores[2].score == scores[3].score == 8
+assert not scores[4].passed and scores[4].issues == ["Too literal"]
+assert [call["source"] for call in provider.calls[1:]] == ["Line 2", "Line 3"]
+print("batched judge check passed")
+
+assert screen_translation("<i>Hello there, Morty.</i>", "<i>سلام مورتی.</i>") == []
+assert screen_translation("Aah!", "آه!") == [] and screen_translation("...", "...") == []
+assert screen_translation("Hello there, Morty.", "Hello there, Morty.") == ["Translation copies the source text", "Translation is not written in the fa script"]
+assert screen_translation("Hello there, Morty.", "سلام مورتی", target_language="ru") == ["Translation is not written in the ru script"]
+assert screen_translation("I need you to come with me, Morty.", "بیا") == ["Translation length is out of proportion to the source"]
+assert screen_translation("<i>Wubba lubba dub dub</i>", "ووبا لوبا داب داب", glossary=["داب داب!"]) == ["Glossary targets missing: ['داب داب!']", "Formatting tags do not match the source"]
+assert screen_translation("Morty", "") == ["Translation is empty"]
+print("heuristic screen check passed")
+
+with tempfile.TemporaryDirectory() as directory:
+    items = [{"id": i, "source": f"Line {i}", "translation": f"T{i}", "glossary": ["x"]} for i in range(1, 5)]
+    provider = BatchJudgeProvider()
+    first = TranslationJudge(provider, cache=EvaluationDatabase(Path(directory) / "evaluations.db")).evaluate_batch(items)
+    # A new judge over the same database (a restarted job) only asks about unseen pairs.
+    provider = BatchJudgeProvider()
+    judge = TranslationJudge(provider, cache=EvaluationDatabase(Path(directory) / "evaluations.db"))
+    again = judge.evaluate_batch(items + [{"id": 5, "source": "Line 5", "translation": "T5"}, {"id": 6, "source": "Line 1", "translation": "T1"}])
+    assert {i: again[i] for i in first} == first and [call for call in provider.calls if isinstance(call, list)] == [[{"id": 5, "source": "Line 5", "translation": "T5", "context": {}, "glossary": []}, {"id": 6, "source": "Line 1", "translation": "T1", "context": {}, "glossary": []}]]
+    assert judge.evaluate("Line 4", "T4", glossary=["x"]) == first[4] and len(provider.calls) == 3
+    # A translator handed an existing store uses it instead of opening its own.
+    store = EvaluationDatabase(Path(directory) / "evaluations.db")
+    translator = SubtitleTranslator(quality_mode="standard", judge=TranslationJudge(provider), evaluations=store, evaluation_path="unused.db")
+    assert translator.evaluations is store and translator.judge.cache is store and not Path("unused.db").exists()
+    assert TranslationJudge(provider, threshold=9.5).cache_key("Line 4", "T4", ["x"]) != judge.cache_key("Line 4", "T4", ["x"])
+print("judge cache check passed")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from src.jobs import JobCancelled, JobDatabase, JobQueue
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+
+with tempfile.TemporaryDirectory() as directory:
+    db = JobDatabase(Path(directory) / "jobs.db")
+    for index in range(6):
+        db.enqueue(f"job-{index}", "in.srt", "out.srt", 1, json.dumps({"index": index}))
+    # A job that was running when the server died, with one line already checkpointed.
+    db.create("crashed", "in.srt", "out.srt", 2, request="{}")
+    db.save_checkpoint("crashed", 0, "done")
+    db.create("bare", "in.srt", "out.srt", 1)
+    handled, active, peak = [], 0, 0
+
+    async def handler(job):
+        global active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        handled.append(job["id"])
+        if job["id"] == "job-5":
+            raise RuntimeError("provider went away")
+        db.set_status(job["id"], "completed")
+
+    async def main():
+        queue = JobQueue(db, handler, workers=3, poll_interval=0.01)
+        started = time.perf_counter()
+        assert await queue.start() == ["crashed"]
+        while len(handled) < 7:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        while not db.requeue("job-5"):
+            await asyncio.sleep(0.01)
+        queue.notify()
+        while len(handled) < 8:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return elapsed
+
+    elapsed = asyncio.run(main())
+    assert sorted(handled) == sorted(["crashed", "job-5"] + [f"job-{index}" for index in range(6)]) and peak == 3
+    assert elapsed < 0.05 * 7 and db.get("bare")["status"] == "running"
+    assert db.get("job-5")["status"] == "failed" and db.checkpoints("crashed") == {0: "done"}
+    assert db.dequeue() is None
+
+    class Provider:
+        def chat(self, messages, temperature=0.2):
+            items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+            return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+
+    path = Path(directory) / "two.srt"
+    path.write_text("1\n00:00:00,000 --> 00:00:01,000\nLine 0\n\n2\n00:00:01,000 --> 00:00:02,000\nLine 1", encoding="utf-8")
+    db.requeue("crashed")
+    assert db.dequeue()["id"] == "crashed"
+    result = SubtitleTranslator().translate_document(SubtitleDocument.load(path), Provider(), job_id="crashed", job_database=db)
+    # The resumed job keeps its stored request and finished line.
+    assert [line.text for line in result.subtitles] == ["done", "T1"]
+    assert db.get("crashed")["request"] == "{}" and db.get("crashed")["status"] == "completed"
+
+    # A cancelled job still held by a live worker is neither resumed nor recovered until its lease lapses.
+    db.enqueue("leased", "in.srt", "out.srt", 2, "{}")
+    assert db.dequeue("other-process")["id"] == "leased"
+    assert db.recover() == [] and not db.requeue("leased")
+    db.set_status("leased", "cancelled")
+    assert not db.requeue("leased") and db.requeue("leased", lease=-1)
+    assert db.dequeue("other-process")["id"] == "leased"
+    db.heartbeat("other-process")
+    assert db.recover() == [] and db.recover(lease=-1) == ["leased"]
+    assert db.dequeue("other-process")["id"] == "leased"
+    db.release("leased", "other-process")
+    assert db.get("leased")["owner"] is None and db.recover() == ["leased"]
+
+    class CancellingProvider(Provider):
+        calls = 0
+
+        def chat(self, messages, temperature=0.2):
+            CancellingProvider.calls += 1
+            db.set_status("leased", "cancelled")
+            return super().chat(messages, temperature)
+
+    # The engine notices the cancel before its next batch and leaves the status alone.
+    try:
+        SubtitleTranslator(batch_size=1, context_mode="none").translate_document(SubtitleDocument.load(path), CancellingProvider(), job_id="leased", job_database=db)
+        raise AssertionError("cancelled job kept running")
+    except JobCancelled:
+        assert CancellingProvider.calls == 1 and db.get("leased")["status"] == "cancelled" and db.checkpoints("leased") == {0: "T0"}
+print("job queue check passed")
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from src.glossary.models import GlossaryEntry
+from src.translation.batching import TokenBudgetBatcher
+from src.translation.engine import SubtitleTranslator
+from src.translation.models import TranslationUnit
+from src.translation.validator import salvage_translations
+
+
+class Provider:
+    def __init__(self, respond):
+        self.respond, self.calls = respond, []
+    def chat(self, messages, temperature=0.2):
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        self.calls.append([x["id"] for x in items])
+        return self.respond(items)
+
+
+units = [TranslationUnit(i, f"Line {i}") for i in range(20)]
+units[13].glossary = [GlossaryEntry("Line", "خط")]
+translator = SubtitleTranslator(context_mode="none")
+
+# Unit 13 never satisfies its glossary: the other 19 lines are salvaged from the first
+# response and only the offending line is retried on its own.
+provider = Provider(lambda items: json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items]))
+try:
+    asyncio.run(translator._translate_batch(units, provider))
+    raise AssertionError("unit 13 should fail")
+except ValueError as exc:
+    assert "subtitle 13" in str(exc)
+assert provider.calls == [list(range(20)), [13], [13]]
+
+# Batches containing unit 5 come back as garbage, so the batch is bisected until
+# unit 5 is alone, which then succeeds.
+def poisoned(items):
+    if len(items) > 1 and any(x["id"] == 5 for x in items):
+        return "not json"
+    return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+provider = Provider(poisoned)
+units[13].glossary = None
+result = asyncio.run(translator._translate_batch(units, provider))
+assert result == {i: f"T{i}" for i in range(20)}
+assert len(provider.calls) <= 3 + 2 * 5
+
+# The same isolation with a batcher: one bad line must not shrink later batches.
+def poisoned_three(items):
+    if len(items) > 1 and any(x["id"] == 3 for x in items):
+        return "not json"
+    return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+batcher = TokenBudgetBatcher(max_units=20)
+for _ in range(3):
+    provider = Provider(poisoned_three)
+    assert asyncio.run(translator._translate_batch(units, provider, batcher)) == {i: f"T{i}" for i in range(20)}
+    assert batcher.max_units == 20 and len(provider.calls) <= 3 + 2 * 5
+assert max(len(call) for call in provider.calls[3:]) == 10
+
+assert salvage_translations('[{"id": 1, "translation": "a"}, {"id": 2}, {"id": 3, "translation": "c"}, {"id": 3, "translation": "d"}]', [1, 2, 3]) == {1: "a"}
+print("batch recovery check passed")
@@ -0,0 +1,42 @@
+import json
+import tempfile
+from pathlib import Path
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.validator import validate_line_translations, validate_translations
+
+repairs = []
+assert validate_translations('Here is the JSON:\n```json\n[{"id": 1, "translation": "a,]"},\n]\n```', [1], repairs) == {1: "a,]"}
+assert repairs == ["fence", "trailing_comma"]
+repairs = []
+assert validate_translations('Sure! [{"id": 1, "translation": "a"}] Hope this helps.', [1], repairs) == {1: "a"}
+assert repairs == ["surrounding_text"]
+repairs = []
+assert validate_line_translations("Translations:\n1|a\n2|b", [1, 2], repairs) == {1: "a", 2: "b"}
+assert repairs == ["surrounding_text"]
+for raw in ['[{"id": 1, "translation": "a"', "no json here", '```\n{"id": 1}\n```']:
+    try:
+        validate_translations(raw, [1])
+        raise AssertionError(raw)
+    except ValueError:
+        pass
+
+
+class Provider:
+    calls = 0
+    def chat(self, messages, temperature=0.2):
+        self.calls += 1
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        return "```json\n" + json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])[:-1] + ",]\n```"
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(12)), encoding="utf-8")
+    provider = Provider()
+    translator = SubtitleTranslator(batch_size=5, max_retries=0)
+    result = translator.translate_document(SubtitleDocument.load(path), provider)
+    assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(12)]
+    assert provider.calls == 3
+    assert translator.repairs == {"fence": 3, "trailing_comma": 3}
+print("response repair check passed")
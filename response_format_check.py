@@ -0,0 +1,30 @@
+import json
+import tempfile
+from pathlib import Path
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.validator import validate_line_translations
+
+assert validate_line_translations("1|سلام\n2|a|b\n", [1, 2]) == {1: "سلام", 2: "a|b"}
+for raw in ["1|a", "1|a\n1|b", "1|a\n3|b", "1|a\nb", "1|a\n2|b\n3|c"]:
+    try:
+        validate_line_translations(raw, [1, 2])
+        raise AssertionError(raw)
+    except ValueError:
+        pass
+
+
+class Provider:
+    response_format = "lines"
+    def chat(self, messages, temperature=0.2):
+        assert "id|translation" in messages[0]["content"]
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        return "\n".join(f"{x['id']}|T{x['id']}" for x in items)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(25)), encoding="utf-8")
+    result = SubtitleTranslator(batch_size=10).translate_document(SubtitleDocument.load(path), Provider())
+    assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(25)]
+print("line response format check passed")
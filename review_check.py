@@ -0,0 +1,133 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.evaluation.database import EvaluationDatabase
+from src.evaluation.judge import TranslationJudge
+from src.evaluation.sampling import SampledReview
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+
+
+class Provider:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.translations = self.corrections = self.active = self.peak = 0
+
+    def chat(self, messages, temperature=0.2):
+        payload = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        if "draft" not in payload["items"][0]:
+            self.translations += 1
+            return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in payload["items"]])
+        self.corrections += 1
+        assert all(x["id"] % 3 == 0 and x["draft"] == f"T{x['id']}" and x["issues"] == ["Too literal"] for x in payload["items"])
+        # Line 9's correction comes back under a duplicated id, so it stays unvalidated and keeps its draft.
+        return json.dumps([{"id": x["id"] if x["id"] != 9 else 6, "translation": f"C{x['id']}"} for x in payload["items"]])
+
+
+class JudgeProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, messages, temperature=0.0):
+        self.calls += 1
+        return json.dumps([{"id": x["id"], "score": 5 if x["id"] % 3 == 0 else 9, "passed": x["id"] % 3 != 0, "issues": ["Too literal"] if x["id"] % 3 == 0 else [], "suggestions": []} for x in json.loads(messages[-1]["content"])])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(40)), encoding="utf-8")
+    provider, judge = Provider(), JudgeProvider()
+    translator = SubtitleTranslator(batch_size=5, max_workers=4, quality_mode="standard", judge=TranslationJudge(judge), evaluation_path=Path(directory) / "evaluations.db")
+    result = translator.translate_document(SubtitleDocument.load(path), provider)
+    expected = [f"C{i}" if i % 3 == 0 and i not in {6, 9} else f"T{i}" for i in range(40)]
+    assert [line.text for line in result.subtitles] == expected
+    # One judge call and at most one correction call per batch, with review overlapping translation.
+    assert provider.translations == judge.calls == 8 and provider.corrections == 8 and provider.peak > 1
+    rows = EvaluationDatabase(Path(directory) / "evaluations.db").connection().execute("SELECT COUNT(*), SUM(passed), COUNT(DISTINCT unit_id), MIN(latency) > 0 FROM evaluations").fetchone()
+    assert rows == (40, 26, 40, 1)
+
+
+class AsyncJudgeProvider(JudgeProvider):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def chat(self, messages, temperature=0.0):
+        raise AssertionError("the review stage must await achat")
+
+    async def achat(self, messages, temperature=0.0):
+        self.threads.add(threading.current_thread())
+        return JudgeProvider.chat(self, messages, temperature)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(40)), encoding="utf-8")
+    judge = AsyncJudgeProvider()
+    SubtitleTranslator(batch_size=5, max_workers=4, quality_mode="standard", judge=TranslationJudge(judge)).translate_document(SubtitleDocument.load(path), Provider())
+    # Judging runs on the job's event loop rather than tying up an executor thread per review.
+    assert judge.calls == 8 and judge.threads == {threading.main_thread()}
+
+
+class FarsiProvider:
+    def chat(self, messages, temperature=0.2):
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        # Every seventh line comes back untranslated.
+        return json.dumps([{"id": x["id"], "translation": f"Line {x['id']}" if x["id"] % 7 == 0 else f"خط {x['id']}"} for x in items])
+
+
+class RecordingJudge:
+    def __init__(self):
+        self.judged = []
+
+    def chat(self, messages, temperature=0.0):
+        items = json.loads(messages[-1]["content"])
+        self.judged += [x["id"] for x in items]
+        return json.dumps([{"id": x["id"], "score": 3, "passed": False, "issues": ["Untranslated"], "suggestions": []} for x in items])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(40)), encoding="utf-8")
+    judge = RecordingJudge()
+    SubtitleTranslator(batch_size=5, quality_mode="fast", judge=TranslationJudge(judge)).translate_document(SubtitleDocument.load(path), FarsiProvider())
+    assert sorted(judge.judged) == [i for i in range(40) if i % 7 == 0]
+
+
+class SampledJudge(RecordingJudge):
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = failing
+        self.calls = 0
+
+    def chat(self, messages, temperature=0.0):
+        self.calls += 1
+        items = json.loads(messages[-1]["content"])
+        self.judged += [x["id"] for x in items]
+        return json.dumps([{"id": x["id"], "score": 3 if x["id"] in self.failing else 9, "passed": x["id"] not in self.failing, "issues": [], "suggestions": []} for x in items])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(100)), encoding="utf-8")
+    document = SubtitleDocument.load(path)
+    judge = SampledJudge(failing=set())
+    SubtitleTranslator(batch_size=10, quality_mode="sampled", judge=TranslationJudge(judge)).translate_document(document, FarsiProvider())
+    # One batch in ten is judged in full and the others cost no judge call.
+    assert judge.calls == 1 and len(judge.judged) == 10 and len({i // 10 for i in judge.judged}) == 1
+    # A bad sample escalates the job, so every later batch is judged.
+    judge = SampledJudge(failing=set(range(100)))
+    translator = SubtitleTranslator(batch_size=10, quality_mode="sampled", judge=TranslationJudge(judge))
+    translator.translate_document(document, FarsiProvider())
+    assert translator.sampler.escalated and translator.sampler.sample([1, 2]) == [1, 2] and len(judge.judged) % 10 == 0
+sampler = SampledReview(rate=0.25, seed=1)
+assert sum(bool(sampler.sample(list(range(8)))) for _ in range(100)) == 25
+print("review stage check passed")
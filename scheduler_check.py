@@ -0,0 +1,45 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.scheduler import ProviderScheduler
+
+
+class Provider:
+    def __init__(self):
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+    def chat(self, messages, temperature=0.2):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+
+
+def run(name, lines, delay=0.0):
+    time.sleep(delay)
+    path = Path(directory) / f"{name}.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\n{name} {i}" for i in range(lines)), encoding="utf-8")
+    SubtitleTranslator(batch_size=5, max_workers=8, context_mode="none", scheduler=scheduler).translate_document(SubtitleDocument.load(path), provider)
+    finished[name] = time.monotonic()
+
+
+with tempfile.TemporaryDirectory() as directory:
+    provider, scheduler, finished = Provider(), ProviderScheduler(2), {}
+    threads = [threading.Thread(target=run, args=("feature", 200)), threading.Thread(target=run, args=("short", 10, 0.05))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Two jobs asking for 8 workers each never exceed the shared cap, and the
+    # short job is served round-robin instead of waiting for the long one.
+    assert provider.peak == 2 and scheduler.active == 0
+    assert finished["short"] < finished["feature"]
+print("scheduler check passed")
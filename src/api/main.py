@@ -3,20 +3,35 @@ import json
 import uuid
 import httpx
 from pathlib import Path
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse, FileResponse
 from src.config import get_settings
 from src.api.schemas import TranslationRequest
-from src.jobs.database import JobDatabase
+from src.jobs import JobCancelled, JobDatabase, JobQueue
+from src.evaluation import EvaluationDatabase, TranslationJudge
 from src.subtitle_engine import SubtitleDocument, SUPPORTED_EXTENSIONS
 from src.translation.engine import SubtitleTranslator
+from src.translation.scheduler import scheduler_for
+from src.glossary import glossary_for
+from src.memory import MemoryDatabase, TranslationMemory
 from src.providers import OllamaProvider, LMStudioProvider, OpenAICompatibleProvider
 
-app = FastAPI(title="Subtitle Translation API")
+
+@asynccontextmanager
+async def lifespan(app):
+    await queue.start()
+    yield
+    await queue.stop()
+
+
+app = FastAPI(title="Subtitle Translation API", lifespan=lifespan)
 settings = get_settings()
 UPLOADS = Path("data/uploads")
 UPLOADS.mkdir(parents=True, exist_ok=True)
 jobs = JobDatabase()
+evaluations = EvaluationDatabase()
+translation_memory = MemoryDatabase()
 
 
 @app.get("/health")
@@ -67,26 +82,36 @@ def test_provider(request: dict):
 
 def _provider(request):
     if request.provider.lower() == "ollama":
-        return OllamaProvider(request.model)
+        return OllamaProvider(request.model, response_format=request.response_format)
     if request.provider.lower() == "lm studio":
-        return LMStudioProvider(request.model, request.base_url)
+        return LMStudioProvider(request.model, request.base_url, response_format=request.response_format)
     if request.provider.lower() in {"openai-compatible", "openai"}:
-        return OpenAICompatibleProvider(request.model, request.base_url, request.api_key)
+        return OpenAICompatibleProvider(request.model, request.base_url, request.api_key, response_format=request.response_format)
     raise HTTPException(400, "Unsupported provider")
 
 
 async def _run_job(job_id, input_path, output_path, request):
     try:
         document = SubtitleDocument.load(input_path)
-        translator = SubtitleTranslator(batch_size=request.batch_size, max_workers=request.max_workers, quality_mode=request.quality_mode, glossary_path="data/glossary.json" if request.glossary_enabled else None, memory_path="data/translation_memory.db")
-        result = await asyncio.to_thread(translator.translate_document, document, _provider(request), job_id, str(input_path), str(output_path), jobs)
+        provider = _provider(request)
+        translator = SubtitleTranslator(batch_size=request.batch_size, max_workers=request.max_workers, concurrency_mode=request.concurrency_mode, token_budget=request.token_budget, streaming=request.streaming, deduplicate=request.deduplicate, quality_mode=request.quality_mode, sample_rate=request.sample_rate, target_language=request.target_language, judge=TranslationJudge(provider) if request.quality_mode != "disabled" else None, evaluations=evaluations, glossary=glossary_for("data/glossary.json") if request.glossary_enabled else None, memory=TranslationMemory(database=translation_memory, source_lang=request.source_language, target_lang=request.target_language), scheduler=scheduler_for(provider, settings.provider_concurrency))
+        result = await asyncio.to_thread(translator.translate_document, document, provider, job_id, str(input_path), str(output_path), jobs)
         result.save(output_path)
+    except JobCancelled:
+        pass
     except Exception:
         jobs.set_status(job_id, "failed")
 
 
+async def _run_queued(job):
+    await _run_job(job["id"], Path(job["source_file"]), Path(job["output_file"]), TranslationRequest.model_validate_json(job["request"]))
+
+
+queue = JobQueue(jobs, _run_queued, settings.job_workers, lease=settings.job_lease_seconds)
+
+
 @app.post("/translate")
-async def translate(file: UploadFile = File(...), request: str = Form(...), background_tasks: BackgroundTasks = None):
+async def translate(file: UploadFile = File(...), request: str = Form(...)):
     config = TranslationRequest.model_validate_json(request)
     suffix = Path(file.filename or "").suffix.lower()
     if suffix not in SUPPORTED_EXTENSIONS:
@@ -96,9 +121,8 @@ async def translate(file: UploadFile = File(...), request: str = Form(...), back
     output_path = UPLOADS / f"{job_id}.fa{suffix}"
     input_path.write_bytes(await file.read())
     document = SubtitleDocument.load(input_path)
-    jobs.create(job_id, str(input_path), str(output_path), len(document.subtitles))
-    if background_tasks is not None:
-        background_tasks.add_task(_run_job, job_id, input_path, output_path, config)
+    jobs.enqueue(job_id, str(input_path), str(output_path), len(document.subtitles), config.model_dump_json())
+    queue.notify()
     return {"job_id": job_id, "status": "queued"}
 
 
@@ -111,6 +135,13 @@ def status(job_id: str):
     return {"job_id": job_id, "status": job["status"], "completed": job["completed_units"], "total": total, "percentage": round(job["completed_units"] * 100 / total, 2) if total else 0}
 
 
+@app.get("/jobs/{job_id}/quality")
+def quality(job_id: str, failures: int = Query(100, ge=0, le=1000)):
+    if not jobs.get(job_id):
+        raise HTTPException(404, "Job not found")
+    return evaluations.quality(job_id, failures)
+
+
 @app.post("/jobs/{job_id}/cancel")
 def cancel(job_id: str):
     if not jobs.get(job_id):
@@ -126,7 +157,11 @@ def resume(job_id: str):
         raise HTTPException(404, "Job not found")
     if job["status"] not in {"cancelled", "failed"}:
         raise HTTPException(409, "Job is not resumable")
-    jobs.set_status(job_id, "pending")
+    if job["request"] is None:
+        raise HTTPException(409, "Job has no stored request to run")
+    if not jobs.requeue(job_id, settings.job_lease_seconds):
+        raise HTTPException(409, "Job is still stopping")
+    queue.notify()
     return status(job_id)
 
 
@@ -10,5 +10,11 @@ class TranslationRequest(BaseModel):
     api_key: str = ""
     batch_size: int = Field(20, ge=1, le=200)
     max_workers: int = Field(1, ge=1, le=32)
+    concurrency_mode: str = "async"
+    token_budget: int | None = Field(None, ge=256)
+    response_format: str = "json"
+    streaming: bool = False
+    deduplicate: str = "text"
     glossary_enabled: bool = True
     quality_mode: str = "disabled"
+    sample_rate: float = Field(0.1, gt=0, le=1)
@@ -13,6 +13,9 @@ class Settings:
     output_dir: Path = Path(os.getenv("SUBTITLE_OUTPUT_DIR", "data/outputs"))
     maximum_upload_size_mb: int = int(os.getenv("SUBTITLE_MAX_UPLOAD_MB", "50"))
     progress_poll_interval_seconds: float = float(os.getenv("SUBTITLE_PROGRESS_POLL", "1"))
+    provider_concurrency: int = int(os.getenv("SUBTITLE_PROVIDER_CONCURRENCY", "4"))
+    job_workers: int = int(os.getenv("SUBTITLE_JOB_WORKERS", "2"))
+    job_lease_seconds: float = float(os.getenv("SUBTITLE_JOB_LEASE", "60"))
 
     def initialize(self):
         self.data_dir.mkdir(parents=True, exist_ok=True)
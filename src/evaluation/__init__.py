@@ -1,4 +1,7 @@
+from .database import EvaluationDatabase
+from .heuristics import screen_translation
 from .judge import TranslationJudge
 from .models import TranslationScore
+from .sampling import SampledReview
 
-__all__ = ["TranslationJudge", "TranslationScore"]
+__all__ = ["EvaluationDatabase", "SampledReview", "TranslationJudge", "TranslationScore", "screen_translation"]
@@ -1,24 +1,57 @@
 import json
-import sqlite3
 from datetime import datetime, timezone
-from pathlib import Path
+from src.storage import SQLiteStore
+from .models import TranslationScore
 
 
-class EvaluationDatabase:
+class EvaluationDatabase(SQLiteStore):
     def __init__(self, path="data/evaluations.db"):
-        self.path = Path(path)
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        db = sqlite3.connect(self.path)
-        try:
-            db.execute("CREATE TABLE IF NOT EXISTS evaluations (translation_id TEXT, score REAL, passed INTEGER, issues TEXT, timestamp TEXT)")
-            db.commit()
-        finally:
-            db.close()
+        super().__init__(path)
+        with self.transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS evaluations (translation_id TEXT, score REAL, passed INTEGER, issues TEXT, timestamp TEXT, job_id TEXT, unit_id INTEGER, model TEXT, latency REAL)")
+            columns = {row[1] for row in db.execute("PRAGMA table_info(evaluations)")}
+            for column, kind in (("job_id", "TEXT"), ("unit_id", "INTEGER"), ("model", "TEXT"), ("latency", "REAL")):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE evaluations ADD COLUMN {column} {kind}")
+            db.execute("CREATE INDEX IF NOT EXISTS evaluations_job ON evaluations(job_id, passed, unit_id)")
+            db.execute("CREATE INDEX IF NOT EXISTS evaluations_model ON evaluations(model, timestamp)")
+            db.execute("CREATE TABLE IF NOT EXISTS judge_cache (key TEXT PRIMARY KEY, score REAL NOT NULL, passed INTEGER NOT NULL, issues TEXT NOT NULL, suggestions TEXT NOT NULL, created_at TEXT NOT NULL) WITHOUT ROWID")
 
-    def save(self, translation_id, score):
-        db = sqlite3.connect(self.path)
-        try:
-            db.execute("INSERT INTO evaluations VALUES (?, ?, ?, ?, ?)", (str(translation_id), score.score, int(score.passed), json.dumps(score.issues, ensure_ascii=False), datetime.now(timezone.utc).isoformat()))
-            db.commit()
-        finally:
-            db.close()
+    def save(self, translation_id, score, job_id=None, model=None, latency=None):
+        self.save_many({translation_id: score}, job_id, model, latency)
+
+    def save_many(self, scores, job_id=None, model=None, latency=None):
+        now = datetime.now(timezone.utc).isoformat()
+        with self.transaction() as db:
+            db.executemany(
+                "INSERT INTO evaluations(translation_id, score, passed, issues, timestamp, job_id, unit_id, model, latency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(str(unit_id), score.score, int(score.passed), json.dumps(score.issues, ensure_ascii=False), now, job_id, unit_id, model, latency) for unit_id, score in scores.items()],
+            )
+
+    def quality(self, job_id, failure_limit=100):
+        db = self.connection()
+        evaluated, passed, average, latency = db.execute("SELECT COUNT(*), COALESCE(SUM(passed), 0), AVG(score), AVG(latency) FROM evaluations WHERE job_id=?", (job_id,)).fetchone()
+        histogram = db.execute("SELECT CAST(score AS INTEGER) AS bucket, COUNT(*) FROM evaluations WHERE job_id=? GROUP BY bucket ORDER BY bucket", (job_id,)).fetchall()
+        failures = db.execute("SELECT unit_id, score, issues, model FROM evaluations WHERE job_id=? AND passed=0 ORDER BY unit_id LIMIT ?", (job_id, failure_limit)).fetchall()
+        return {
+            "job_id": job_id, "evaluated": evaluated, "passed": passed, "failed": evaluated - passed,
+            "average_score": round(average, 2) if average is not None else None,
+            "average_latency": round(latency, 3) if latency is not None else None,
+            "histogram": [{"score": bucket, "count": count} for bucket, count in histogram],
+            "failures": [{"unit_id": unit_id, "score": score, "issues": json.loads(issues), "model": model} for unit_id, score, issues, model in failures],
+        }
+
+    def cached_scores(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        db = self.connection()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for key, score, passed, issues, suggestions in db.execute(f"SELECT key, score, passed, issues, suggestions FROM judge_cache WHERE key IN ({', '.join('?' * len(chunk))})", chunk):
+                found[key] = TranslationScore(score, bool(passed), json.loads(issues), json.loads(suggestions))
+        return found
+
+    def cache_scores(self, scores):
+        now = datetime.now(timezone.utc).isoformat()
+        with self.transaction() as db:
+            db.executemany("INSERT OR REPLACE INTO judge_cache VALUES (?, ?, ?, ?, ?, ?)", [(key, score.score, int(score.passed), json.dumps(score.issues, ensure_ascii=False), json.dumps(score.suggestions, ensure_ascii=False), now) for key, score in scores.items()])
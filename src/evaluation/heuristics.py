@@ -0,0 +1,38 @@
+import re
+from collections import Counter
+
+ARABIC = r"\u0600-\u06ff\u0750-\u077f\ufb50-\ufdff\ufe70-\ufeff"
+CYRILLIC = r"\u0400-\u04ff"
+HAN = r"\u3400-\u4dbf\u4e00-\u9fff"
+SCRIPTS = {
+    "fa": ARABIC, "ar": ARABIC, "ur": ARABIC,
+    "he": r"\u0590-\u05ff\ufb1d-\ufb4f",
+    "ru": CYRILLIC, "uk": CYRILLIC, "bg": CYRILLIC,
+    "el": r"\u0370-\u03ff\u1f00-\u1fff",
+    "hi": r"\u0900-\u097f",
+    "th": r"\u0e00-\u0e7f",
+    "zh": HAN, "ja": r"\u3040-\u30ff" + HAN, "ko": r"\uac00-\ud7af\u1100-\u11ff\u3130-\u318f",
+}
+TAG = re.compile(r"<[^>]+>|\{\\[^}]*\}")
+
+
+def screen_translation(source: str, translation: str, target_language: str = "fa", glossary: list[str] | None = None, min_ratio: float = 0.3, max_ratio: float = 3.0) -> list[str]:
+    # Cheap local checks; an empty result means the line does not need the LLM judge.
+    issues = []
+    text, original = TAG.sub("", translation).strip(), TAG.sub("", source).strip()
+    if not text:
+        return ["Translation is empty"] if original else []
+    if " ".join(text.lower().split()) == " ".join(original.lower().split()) and any(char.isalpha() for char in original):
+        issues.append("Translation copies the source text")
+    if len(original) >= 10 and not min_ratio <= len(text) / len(original) <= max_ratio:
+        issues.append("Translation length is out of proportion to the source")
+    letters = [char for char in text if char.isalpha()]
+    script = SCRIPTS.get(target_language.split("-")[0].lower())
+    if script and letters and len(re.findall(f"[{script}]", "".join(letters))) < len(letters) / 2:
+        issues.append(f"Translation is not written in the {target_language} script")
+    missing = [target for target in glossary or [] if target not in translation]
+    if missing:
+        issues.append(f"Glossary targets missing: {missing}")
+    if Counter(TAG.findall(translation)) != Counter(TAG.findall(source)):
+        issues.append("Formatting tags do not match the source")
+    return issues
@@ -1,23 +1,107 @@
+import hashlib
 import json
+from collections import Counter
+from src.providers.base import achat
 from .models import TranslationScore
-from .prompts import judge_messages
+from .prompts import judge_batch_messages, judge_messages
 
 
 class TranslationJudge:
-    def __init__(self, provider, threshold: float = 7.0):
+    def __init__(self, provider, threshold: float = 7.0, cache=None):
         self.provider = provider
         self.threshold = threshold
+        self.cache = cache
+
+    def cache_key(self, source, translation, glossary=None):
+        model = getattr(self.provider, "model", type(self.provider).__name__)
+        return hashlib.sha256(json.dumps([source, translation, sorted(glossary or []), model, self.threshold], ensure_ascii=False).encode("utf-8")).hexdigest()
 
     def evaluate(self, source, translation, context=None, glossary=None):
-        raw = self.provider.chat(judge_messages(source, translation, context, glossary), temperature=0.0)
+        key, score = self._cached(source, translation, glossary)
+        if score is None:
+            score = self._store(key, self._parse(self.provider.chat(judge_messages(source, translation, context, glossary), temperature=0.0)))
+        return score
+
+    async def aevaluate(self, source, translation, context=None, glossary=None):
+        key, score = self._cached(source, translation, glossary)
+        if score is None:
+            score = self._store(key, self._parse(await achat(self.provider, judge_messages(source, translation, context, glossary), temperature=0.0)))
+        return score
+
+    def evaluate_batch(self, items: list[dict]) -> dict[int, TranslationScore]:
+        # items: {"id", "source", "translation", optional "context" and "glossary"}.
+        # One prompt scores the batch; ids missing or invalid in the reply are judged one by one.
+        scores, keys, items = self._cached_batch(items)
+        cached_ids = set(scores)
+        if items:
+            scores.update(self._parse_batch(self.provider.chat(judge_batch_messages(items), temperature=0.0), items))
+        for item in items:
+            if item["id"] not in scores:
+                scores[item["id"]] = self.evaluate(item["source"], item["translation"], item.get("context"), item.get("glossary"))
+        return self._store_batch(scores, keys, cached_ids)
+
+    async def aevaluate_batch(self, items: list[dict]) -> dict[int, TranslationScore]:
+        # Same as evaluate_batch, awaiting the provider's native async chat instead of blocking a thread.
+        scores, keys, items = self._cached_batch(items)
+        cached_ids = set(scores)
+        if items:
+            scores.update(self._parse_batch(await achat(self.provider, judge_batch_messages(items), temperature=0.0), items))
+        for item in items:
+            if item["id"] not in scores:
+                scores[item["id"]] = await self.aevaluate(item["source"], item["translation"], item.get("context"), item.get("glossary"))
+        return self._store_batch(scores, keys, cached_ids)
+
+    def _cached(self, source, translation, glossary):
+        key = self.cache_key(source, translation, glossary) if self.cache is not None else None
+        return key, self.cache.cached_scores([key]).get(key) if key else None
+
+    def _store(self, key, score):
+        if key:
+            self.cache.cache_scores({key: score})
+        return score
+
+    def _cached_batch(self, items):
+        scores = {}
+        keys = {item["id"]: self.cache_key(item["source"], item["translation"], item.get("glossary")) for item in items} if self.cache is not None else {}
+        if keys:
+            cached = self.cache.cached_scores(keys.values())
+            scores.update({unit_id: cached[key] for unit_id, key in keys.items() if key in cached})
+            items = [item for item in items if item["id"] not in scores]
+        return scores, keys, items
+
+    def _store_batch(self, scores, keys, cached_ids):
+        if keys:
+            self.cache.cache_scores({keys[unit_id]: score for unit_id, score in scores.items() if unit_id not in cached_ids})
+        return scores
+
+    def _parse(self, raw):
         try:
-            data = json.loads(raw)
-            score = float(data["score"])
-            passed = bool(data["passed"]) and score >= self.threshold
-            issues = data["issues"]
-            suggestions = data.get("suggestions", [])
-            if not 1 <= score <= 10 or not isinstance(issues, list) or not isinstance(suggestions, list):
-                raise ValueError
+            return self._score(json.loads(raw))
         except (json.JSONDecodeError, KeyError, TypeError, ValueError) as exc:
             raise ValueError("Judge returned an invalid evaluation") from exc
+
+    def _parse_batch(self, raw, items):
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError:
+            payload = None
+        scores = {}
+        expected = {item["id"] for item in items}
+        rows = [data for data in payload if isinstance(data, dict) and isinstance(data.get("id"), int)] if isinstance(payload, list) else []
+        counts = Counter(data["id"] for data in rows)
+        for data in rows:
+            if data["id"] in expected and counts[data["id"]] == 1:
+                try:
+                    scores[data["id"]] = self._score(data)
+                except (KeyError, TypeError, ValueError):
+                    pass
+        return scores
+
+    def _score(self, data):
+        score = float(data["score"])
+        passed = bool(data["passed"]) and score >= self.threshold
+        issues = data["issues"]
+        suggestions = data.get("suggestions", [])
+        if not 1 <= score <= 10 or not isinstance(issues, list) or not isinstance(suggestions, list):
+            raise ValueError
         return TranslationScore(score, passed, issues, suggestions)
@@ -7,3 +7,11 @@ def judge_messages(source, translation, context=None, glossary=None):
         {"role": "system", "content": "You are a subtitle translation reviewer. Evaluate meaning, fluency, missing or added information, glossary compliance, and style. Return JSON only with score (1-10), passed (boolean), issues (array), and suggestions (array)."},
         {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
     ]
+
+
+def judge_batch_messages(items):
+    payload = [{"id": item["id"], "source": item["source"], "translation": item["translation"], "context": item.get("context") or {}, "glossary": item.get("glossary") or []} for item in items]
+    return [
+        {"role": "system", "content": "You are a subtitle translation reviewer. Evaluate each item for meaning, fluency, missing or added information, glossary compliance, and style. Return a JSON array only, one object per item with id, score (1-10), passed (boolean), issues (array), and suggestions (array)."},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
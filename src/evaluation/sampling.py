@@ -0,0 +1,35 @@
+import random
+
+
+class SampledReview:
+    # Judges whole batches at the sample rate, so unsampled batches cost no judge call.
+    # A credit carried between batches picks exactly rate * batches of them, starting
+    # at a random offset. Once the job-wide failure rate crosses the threshold (over at
+    # least min_samples lines) every later batch is judged.
+    def __init__(self, rate: float = 0.1, threshold: float = 0.2, min_samples: int = 10, seed=None):
+        if not 0 < rate <= 1:
+            raise ValueError("sample rate must be between 0 and 1")
+        self.rate = rate
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.random = random.Random(seed)
+        self.credit = self.random.random()
+        self.judged = 0
+        self.failed = 0
+        self.escalated = False
+
+    def sample(self, units: list) -> list:
+        if self.escalated:
+            return list(units)
+        self.credit += self.rate
+        if self.credit < 1:
+            return []
+        self.credit -= 1
+        return list(units)
+
+    def record(self, scores):
+        scores = list(scores)
+        self.judged += len(scores)
+        self.failed += sum(not score.passed for score in scores)
+        if self.judged >= self.min_samples and self.failed > self.threshold * self.judged:
+            self.escalated = True
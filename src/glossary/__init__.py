@@ -1,4 +1,6 @@
 from .models import GlossaryEntry
+from .matcher import GlossaryMatcher
 from .service import GlossaryService
+from .registry import GlossaryRegistry, glossary_for
 
-__all__ = ["GlossaryEntry", "GlossaryService"]
+__all__ = ["GlossaryEntry", "GlossaryMatcher", "GlossaryRegistry", "GlossaryService", "glossary_for"]
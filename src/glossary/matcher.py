@@ -0,0 +1,95 @@
+import re
+from collections import deque
+from functools import lru_cache
+from .models import GlossaryEntry
+
+try:
+    # Fold exactly like re.IGNORECASE: simple per-character lowercase plus the
+    # extra equivalences re adds (e.g. ſ/s, ς/σ), so no regex match is missed.
+    from _sre import unicode_tolower as _tolower
+    from re._compiler import _EXTRA_CASES
+except ImportError:  # pragma: no cover - non-CPython fallback
+    _EXTRA_CASES = {}
+
+    def _tolower(code):
+        lowered = chr(code).lower()
+        return ord(lowered) if len(lowered) == 1 else code
+
+
+@lru_cache(maxsize=65536)
+def _fold_char(char: str) -> str:
+    code = _tolower(ord(char))
+    return chr(min((code, *_EXTRA_CASES.get(code, ()))))
+
+
+def fold(text: str) -> str:
+    return "".join(map(_fold_char, text))
+
+
+class _Automaton:
+    def __init__(self, patterns: list[tuple[str, int]]):
+        self.goto = [{}]
+        self.output = [[]]
+        for pattern, index in patterns:
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append(index)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text: str) -> set[int]:
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found.update(self.output[node])
+        return found
+
+
+class GlossaryMatcher:
+    def __init__(self, entries: list[GlossaryEntry], word_boundaries: bool = False, memo_size: int = 4096):
+        self.entries = list(entries)
+        self.word_boundaries = word_boundaries
+        self.memo_size = memo_size
+        self._memo = {}
+        self._always = [index for index, entry in enumerate(self.entries) if not entry.source]
+        self._exact = _Automaton([(entry.source, index) for index, entry in enumerate(self.entries) if entry.source and entry.case_sensitive])
+        self._folded = _Automaton([(fold(entry.source), index) for index, entry in enumerate(self.entries) if entry.source and not entry.case_sensitive])
+        self._patterns = {}
+
+    def find(self, text: str) -> list[GlossaryEntry]:
+        # Another thread may clear the memo at any point, so never read back what was just stored.
+        result = self._memo.get(text)
+        if result is None:
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            candidates = self._exact.search(text) | self._folded.search(fold(text)) | set(self._always)
+            result = [self.entries[index] for index in sorted(candidates) if self._pattern(index).search(text)]
+            self._memo[text] = result
+        return list(result)
+
+    def _pattern(self, index):
+        # Candidates are confirmed with the same regex the per-entry scan used.
+        if index not in self._patterns:
+            entry = self.entries[index]
+            pattern = re.escape(entry.source)
+            if self.word_boundaries:
+                pattern = rf"(?<!\w){pattern}(?!\w)"
+            self._patterns[index] = re.compile(pattern, 0 if entry.case_sensitive else re.IGNORECASE)
+        return self._patterns[index]
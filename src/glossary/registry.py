@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from .models import GlossaryEntry
+from .service import GlossaryService
+
+
+class GlossaryRegistry:
+    # Compiles each glossary file once and swaps in a rebuilt service when the file
+    # changes. Callers hold on to the service they got, so a running job keeps an
+    # unchanging snapshot while new jobs see the edit.
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self, path: str | Path) -> GlossaryService:
+        path = Path(path).resolve()
+        with self._lock:
+            if path not in self._loaded:
+                self._loaded[path] = self._load(path)
+            if self._watcher is None and self.poll_interval > 0:
+                self._watcher = threading.Thread(target=self._watch, name="glossary-registry", daemon=True)
+                self._watcher.start()
+            return self._loaded[path][2]
+
+    def refresh(self):
+        with self._lock:
+            loaded = dict(self._loaded)
+        for path, (stamp, digest, _) in loaded.items():
+            try:
+                current = self._stamp(path)
+                if current == stamp:
+                    continue
+                data = path.read_bytes()
+                if hashlib.sha256(data).hexdigest() == digest:
+                    with self._lock:
+                        self._loaded[path] = (current, digest, self._loaded[path][2])
+                    continue
+                reloaded = self._build(current, data)
+            except (OSError, ValueError, TypeError):
+                # A missing or half-written file keeps the last good snapshot.
+                continue
+            with self._lock:
+                self._loaded[path] = reloaded
+
+    def close(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def _load(self, path):
+        stamp = self._stamp(path)
+        return self._build(stamp, path.read_bytes())
+
+    @staticmethod
+    def _stamp(path):
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _build(stamp, data):
+        entries = tuple(GlossaryEntry(**item) for item in json.loads(data.decode("utf-8")))
+        return stamp, hashlib.sha256(data).hexdigest(), GlossaryService(entries)
+
+
+_registry = GlossaryRegistry()
+
+
+def glossary_for(path: str | Path) -> GlossaryService:
+    return _registry.get(path)
@@ -1,19 +1,15 @@
 import json
-import re
 from pathlib import Path
+from .matcher import GlossaryMatcher
 from .models import GlossaryEntry
 
 
 class GlossaryService:
-    def __init__(self, entries: list[GlossaryEntry] | None = None, path: str | Path | None = None):
+    def __init__(self, entries: list[GlossaryEntry] | None = None, path: str | Path | None = None, word_boundaries: bool = False):
         if path:
             entries = [GlossaryEntry(**item) for item in json.loads(Path(path).read_text(encoding="utf-8"))]
         self.entries = entries or []
+        self.matcher = GlossaryMatcher(self.entries, word_boundaries=word_boundaries)
 
     def find_terms(self, text: str) -> list[GlossaryEntry]:
-        found = []
-        for entry in self.entries:
-            flags = 0 if entry.case_sensitive else re.IGNORECASE
-            if re.search(re.escape(entry.source), text, flags):
-                found.append(entry)
-        return found
+        return self.matcher.find(text)
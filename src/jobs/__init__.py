@@ -1,4 +1,5 @@
-from .database import JobDatabase
+from .database import JobCancelled, JobDatabase
 from .models import TranslationJob
+from .queue import JobQueue
 
-__all__ = ["JobDatabase", "TranslationJob"]
+__all__ = ["JobCancelled", "JobDatabase", "JobQueue", "TranslationJob"]
@@ -1,59 +1,93 @@
 import sqlite3
+import time
 from datetime import datetime, timezone
-from pathlib import Path
+from src.storage import SQLiteStore
 from .models import TranslationJob
+from .writer import CheckpointWriter
 
 
-class JobDatabase:
+class JobCancelled(Exception):
+    pass
+
+
+class JobDatabase(SQLiteStore):
     def __init__(self, path="data/jobs.db"):
-        self.path = Path(path)
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        db = sqlite3.connect(self.path)
-        try:
-            db.executescript("""CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, source_file TEXT, output_file TEXT, status TEXT, total_units INTEGER, completed_units INTEGER, created_at TEXT);
-            CREATE TABLE IF NOT EXISTS checkpoints (job_id TEXT, unit_id INTEGER, translation TEXT, created_at TEXT, PRIMARY KEY(job_id, unit_id));""")
-            db.commit()
-        finally:
-            db.close()
-
-    def create(self, job_id, source_file, output_file, total_units):
-        db = sqlite3.connect(self.path)
-        try:
-            db.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, 'running', ?, 0, ?)", (job_id, source_file, output_file, total_units, datetime.now(timezone.utc).isoformat()))
-            db.commit()
-        finally:
-            db.close()
+        super().__init__(path)
+        with self.transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, source_file TEXT, output_file TEXT, status TEXT, total_units INTEGER, completed_units INTEGER, created_at TEXT, request TEXT)")
+            columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("request", "TEXT"), ("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+            db.execute("CREATE TABLE IF NOT EXISTS checkpoints (job_id TEXT, unit_id INTEGER, translation TEXT, created_at TEXT, PRIMARY KEY(job_id, unit_id))")
+        self.writer = CheckpointWriter(self)
+
+    def create(self, job_id, source_file, output_file, total_units, status="running", request=None):
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs(id, source_file, output_file, status, total_units, completed_units, created_at, request) VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                (job_id, source_file, output_file, status, total_units, datetime.now(timezone.utc).isoformat(), request),
+            )
+
+    def enqueue(self, job_id, source_file, output_file, total_units, request: str):
+        self.create(job_id, source_file, output_file, total_units, "queued", request)
+
+    def requeue(self, job_id, lease: float = 60.0) -> bool:
+        # A job whose worker still holds a live lease may still be running (a cancel
+        # only stops it at the next batch), so it is not handed to a second worker.
+        with self.transaction() as db:
+            return db.execute("UPDATE jobs SET status='queued', owner=NULL WHERE id=? AND (owner IS NULL OR heartbeat < ?) RETURNING id", (job_id, time.time() - lease)).fetchone() is not None
+
+    def dequeue(self, owner=None):
+        # A single UPDATE claims the oldest queued job, so concurrent workers (or
+        # processes sharing the database) never start the same job twice.
+        with self.transaction() as db:
+            cursor = db.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute("UPDATE jobs SET status='running', owner=?, heartbeat=? WHERE id=(SELECT id FROM jobs WHERE status='queued' AND request IS NOT NULL ORDER BY created_at LIMIT 1) RETURNING *", (owner, time.time())).fetchall()
+        return dict(rows[0]) if rows else None
+
+    def heartbeat(self, owner):
+        with self.transaction() as db:
+            db.execute("UPDATE jobs SET heartbeat=? WHERE owner=?", (time.time(), owner))
+
+    def release(self, job_id, owner):
+        with self.transaction() as db:
+            db.execute("UPDATE jobs SET owner=NULL WHERE id=? AND owner=?", (job_id, owner))
+
+    def recover(self, lease: float = 60.0):
+        # Running jobs without an owner, or whose owner stopped renewing its lease, were
+        # interrupted by a crash or restart; their checkpoints let them resume.
+        with self.transaction() as db:
+            return [row[0] for row in db.execute("UPDATE jobs SET status='queued', owner=NULL WHERE status='running' AND request IS NOT NULL AND (owner IS NULL OR heartbeat < ?) RETURNING id", (time.time() - lease,)).fetchall()]
 
     def checkpoints(self, job_id):
-        db = sqlite3.connect(self.path)
-        try:
-            return dict(db.execute("SELECT unit_id, translation FROM checkpoints WHERE job_id=?", (job_id,)).fetchall())
-        finally:
-            db.close()
+        return dict(self.connection().execute("SELECT unit_id, translation FROM checkpoints WHERE job_id=?", (job_id,)).fetchall())
 
     def save_checkpoint(self, job_id, unit_id, translation):
-        db = sqlite3.connect(self.path)
-        try:
-            db.execute("BEGIN")
-            db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", (job_id, unit_id, translation, datetime.now(timezone.utc).isoformat()))
-            db.execute("UPDATE jobs SET completed_units=(SELECT COUNT(*) FROM checkpoints WHERE job_id=?) WHERE id=?", (job_id, job_id))
-            db.commit()
-        finally:
-            db.close()
+        self.save_checkpoints(job_id, {unit_id: translation})
+
+    def save_checkpoints(self, job_id, translations: dict[int, str]):
+        with self.transaction() as db:
+            self._write_checkpoints(db, job_id, translations)
+
+    def _write_checkpoints(self, db, job_id, translations):
+        unit_ids = list(translations)
+        existing = set()
+        for start in range(0, len(unit_ids), 500):
+            chunk = unit_ids[start:start + 500]
+            existing.update(row[0] for row in db.execute(f"SELECT unit_id FROM checkpoints WHERE job_id=? AND unit_id IN ({', '.join('?' * len(chunk))})", (job_id, *chunk)))
+        now = datetime.now(timezone.utc).isoformat()
+        db.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", [(job_id, unit_id, translation, now) for unit_id, translation in translations.items()])
+        db.execute("UPDATE jobs SET completed_units=completed_units + ? WHERE id=?", (len(unit_ids) - len(existing), job_id))
 
     def set_status(self, job_id, status):
-        db = sqlite3.connect(self.path)
-        try:
+        with self.transaction() as db:
             db.execute("UPDATE jobs SET status=? WHERE id=?", (status, job_id))
-            db.commit()
-        finally:
-            db.close()
 
     def get(self, job_id):
-        db = sqlite3.connect(self.path)
-        db.row_factory = sqlite3.Row
-        try:
-            row = db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
-            return dict(row) if row else None
-        finally:
-            db.close()
+        cursor = self.connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,63 @@
+import asyncio
+import uuid
+
+
+class JobQueue:
+    def __init__(self, database, handler, workers: int = 2, poll_interval: float = 1.0, lease: float = 60.0):
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if lease <= 0:
+            raise ValueError("lease must be positive")
+        self.database = database
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self._tasks = []
+        self._wake = None
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        recovered = await asyncio.to_thread(self.database.recover, self.lease)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)] + [asyncio.create_task(self._heartbeat())]
+        return recovered
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        # Endpoints may run in FastAPI's thread pool, so wake the workers through their loop.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _work(self):
+        while True:
+            job = await asyncio.to_thread(self.database.dequeue, self.owner)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            try:
+                await self.handler(job)
+            except Exception:
+                await asyncio.to_thread(self.database.set_status, job["id"], "failed")
+            finally:
+                await asyncio.to_thread(self.database.release, job["id"], self.owner)
+
+    async def _heartbeat(self):
+        # Renewing the lease on this queue's jobs lets processes sharing the database
+        # tell them apart from jobs whose process died, which are requeued once it lapses.
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.database.heartbeat, self.owner)
+            if await asyncio.to_thread(self.database.recover, self.lease):
+                self._wake.set()
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import defaultdict
+
+
+class CheckpointWriter:
+    def __init__(self, database, flush_interval: float = 0.005):
+        self.database = database
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(dict)
+        self._errors = {}
+        self._submitted = 0
+        self._written = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, job_id, translations: dict[int, str]):
+        if not translations:
+            return
+        with self._condition:
+            self._pending[job_id].update(translations)
+            self._submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self, job_id=None):
+        with self._condition:
+            target = self._submitted
+            self._condition.wait_for(lambda: self._written >= target)
+            error = self._errors.pop(job_id, None) if job_id is not None else next(iter(self._errors.values()), None)
+            if job_id is None:
+                self._errors.clear()
+        if error:
+            raise error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+            # Let other batches finishing in the same few milliseconds join this transaction.
+            time.sleep(self.flush_interval)
+            with self._condition:
+                pending, self._pending = self._pending, defaultdict(dict)
+                target = self._submitted
+            try:
+                with self.database.transaction() as db:
+                    for job_id, translations in pending.items():
+                        self.database._write_checkpoints(db, job_id, translations)
+            except Exception as exc:
+                with self._condition:
+                    self._errors.update(dict.fromkeys(pending, exc))
+            with self._condition:
+                self._written = target
+                self._condition.notify_all()
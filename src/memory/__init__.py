@@ -1,4 +1,5 @@
+from .database import MemoryDatabase
 from .models import MemoryEntry
 from .service import TranslationMemory
 
-__all__ = ["MemoryEntry", "TranslationMemory"]
+__all__ = ["MemoryDatabase", "MemoryEntry", "TranslationMemory"]
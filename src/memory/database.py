@@ -1,43 +1,96 @@
 import hashlib
-import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
+from src.storage import SQLiteStore
+from .index import grams, length_bounds, min_shared_grams, normalize
 
 
 def text_hash(text: str) -> str:
     return hashlib.sha256(text.strip().lower().encode("utf-8")).hexdigest()
 
 
-class MemoryDatabase:
+class MemoryDatabase(SQLiteStore):
     def __init__(self, path: str | Path = "data/translation_memory.db"):
-        self.path = Path(path)
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        db = self._connect()
-        try:
+        super().__init__(path)
+        with self.transaction() as db:
             db.execute("""CREATE TABLE IF NOT EXISTS translations (
                 id INTEGER PRIMARY KEY, source_text TEXT NOT NULL,
                 translated_text TEXT NOT NULL, source_lang TEXT NOT NULL,
                 target_lang TEXT NOT NULL, created_at TEXT NOT NULL,
-                hash TEXT NOT NULL, UNIQUE(hash, source_lang, target_lang))""")
-            db.commit()
-        finally:
-            db.close()
+                hash TEXT NOT NULL, source_length INTEGER, UNIQUE(hash, source_lang, target_lang))""")
+            if "source_length" not in {row[1] for row in db.execute("PRAGMA table_info(translations)")}:
+                db.execute("ALTER TABLE translations ADD COLUMN source_length INTEGER")
+            db.execute("""CREATE TABLE IF NOT EXISTS translation_grams (
+                gram TEXT NOT NULL, source_lang TEXT NOT NULL, target_lang TEXT NOT NULL,
+                source_length INTEGER NOT NULL, translation_id INTEGER NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY(gram, source_lang, target_lang, source_length, translation_id)) WITHOUT ROWID""")
+            db.execute("CREATE INDEX IF NOT EXISTS translation_grams_owner ON translation_grams(translation_id)")
+            db.execute("CREATE INDEX IF NOT EXISTS translations_length ON translations(source_lang, target_lang, source_length)")
+            for row in db.execute("SELECT id, source_text, source_lang, target_lang FROM translations WHERE source_length IS NULL").fetchall():
+                self._index(db, *row)
 
-    def _connect(self):
-        return sqlite3.connect(self.path)
+    def _index(self, db, translation_id, source, source_lang, target_lang):
+        normalized = normalize(source)
+        db.execute("UPDATE translations SET source_length=? WHERE id=?", (len(normalized), translation_id))
+        db.executemany("INSERT INTO translation_grams VALUES (?, ?, ?, ?, ?, ?)", [
+            (gram, source_lang, target_lang, len(normalized), translation_id, n) for gram, n in grams(normalized).items()
+        ])
 
     def get_exact(self, text, source_lang, target_lang):
-        db = self._connect()
-        try:
-            row = db.execute("SELECT translated_text FROM translations WHERE hash=? AND source_lang=? AND target_lang=?", (text_hash(text), source_lang, target_lang)).fetchone()
-        finally:
-            db.close()
+        row = self.connection().execute("SELECT translated_text FROM translations WHERE hash=? AND source_lang=? AND target_lang=?", (text_hash(text), source_lang, target_lang)).fetchone()
         return row[0] if row else None
 
+    def get_exact_many(self, texts, source_lang, target_lang):
+        hashes = list(dict.fromkeys(text_hash(text) for text in texts))
+        found = {}
+        db = self.connection()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            found.update(db.execute(f"SELECT hash, translated_text FROM translations WHERE source_lang=? AND target_lang=? AND hash IN ({', '.join('?' * len(chunk))})", (source_lang, target_lang, *chunk)).fetchall())
+        return {text: found.get(text_hash(text)) for text in texts}
+
+    def fuzzy_candidates(self, text, source_lang, target_lang, threshold):
+        return self.fuzzy_candidates_many([text], source_lang, target_lang, threshold)[text]
+
+    def fuzzy_candidates_many(self, texts, source_lang, target_lang, threshold):
+        db = self.connection()
+        return {text: self._fuzzy_candidates(db, text, source_lang, target_lang, threshold) for text in dict.fromkeys(texts)}
+
+    def _fuzzy_candidates(self, db, text, source_lang, target_lang, threshold):
+        if threshold <= 0:
+            return db.execute("SELECT source_text, translated_text FROM translations WHERE source_lang=? AND target_lang=? ORDER BY id", (source_lang, target_lang)).fetchall()
+        normalized = normalize(text)
+        low, high = length_bounds(len(normalized), threshold)
+        required = {length: min_shared_grams(len(normalized), length, threshold) for length in range(low, high + 1)}
+        unfiltered = [length for length, n in required.items() if n <= 0]
+        query = list(grams(normalized).items())
+        rows = []
+        if unfiltered:
+            rows += db.execute(
+                f"SELECT id, source_text, translated_text FROM translations WHERE source_lang=? AND target_lang=? AND source_length IN ({', '.join('?' * len(unfiltered))})",
+                (source_lang, target_lang, *unfiltered),
+            ).fetchall()
+        if len(unfiltered) < len(required) and query:
+            shared = db.execute(
+                f"""WITH query(gram, n) AS (VALUES {', '.join(['(?, ?)'] * len(query))})
+                SELECT g.translation_id, g.source_length, SUM(MIN(g.n, query.n)) FROM query
+                JOIN translation_grams g ON g.gram=query.gram AND g.source_lang=? AND g.target_lang=? AND g.source_length BETWEEN ? AND ?
+                GROUP BY g.translation_id""",
+                (*[value for pair in query for value in pair], source_lang, target_lang, low, high),
+            ).fetchall()
+            ids = [translation_id for translation_id, length, n in shared if 0 < required[length] <= n]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows += db.execute(f"SELECT id, source_text, translated_text FROM translations WHERE id IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+        return [(source, translation) for _, source, translation in sorted(rows)]
+
     def put(self, source, translation, source_lang, target_lang):
-        db = self._connect()
-        try:
-            db.execute("INSERT OR REPLACE INTO translations(source_text, translated_text, source_lang, target_lang, created_at, hash) VALUES (?, ?, ?, ?, ?, ?)", (source, translation, source_lang, target_lang, datetime.now(timezone.utc).isoformat(), text_hash(source)))
-            db.commit()
-        finally:
-            db.close()
+        self.put_many([(source, translation)], source_lang, target_lang)
+
+    def put_many(self, pairs, source_lang, target_lang):
+        now = datetime.now(timezone.utc).isoformat()
+        with self.transaction() as db:
+            for source, translation in pairs:
+                db.execute("DELETE FROM translation_grams WHERE translation_id IN (SELECT id FROM translations WHERE hash=? AND source_lang=? AND target_lang=?)", (text_hash(source), source_lang, target_lang))
+                cursor = db.execute("INSERT OR REPLACE INTO translations(source_text, translated_text, source_lang, target_lang, created_at, hash) VALUES (?, ?, ?, ?, ?, ?)", (source, translation, source_lang, target_lang, now, text_hash(source)))
+                self._index(db, cursor.lastrowid, source, source_lang, target_lang)
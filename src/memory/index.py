@@ -0,0 +1,31 @@
+import math
+from collections import Counter
+
+GRAM_SIZE = 3
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def grams(normalized: str) -> Counter:
+    return Counter(normalized[i:i + GRAM_SIZE] for i in range(len(normalized) - GRAM_SIZE + 1))
+
+
+def length_bounds(length: int, threshold: float) -> tuple[int, int]:
+    # SequenceMatcher.ratio() <= 2 * min(a, b) / (a + b), so longer or shorter
+    # sources can never reach the threshold. One character of slack absorbs float error.
+    low = math.floor(length * threshold / (2 - threshold)) - 1
+    high = math.ceil(length * (2 - threshold) / threshold) + 1
+    return max(low, 1), high
+
+
+def max_edits(length: int, other: int, threshold: float) -> int:
+    # ratio = 2M / (a + b) and the matched blocks form a common subsequence, so
+    # the edit distance is at most a + b - 2M <= (1 - threshold) * (a + b).
+    return math.floor((1 - threshold) * (length + other) + 1e-9)
+
+
+def min_shared_grams(length: int, other: int, threshold: float) -> int:
+    # q-gram lemma: strings within k edits share max(a, b) - q + 1 - k * q q-grams.
+    return max(length, other) - GRAM_SIZE + 1 - max_edits(length, other, threshold) * GRAM_SIZE
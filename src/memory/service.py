@@ -3,28 +3,42 @@ from .database import MemoryDatabase
 
 
 class TranslationMemory:
-    def __init__(self, path="data/translation_memory.db", source_lang="auto", target_lang="fa", similarity_threshold=0.92):
-        self.database = MemoryDatabase(path)
+    def __init__(self, path="data/translation_memory.db", source_lang="auto", target_lang="fa", similarity_threshold=0.92, database=None):
+        # Jobs share one database so each one doesn't open its own connections.
+        self.database = database if database is not None else MemoryDatabase(path)
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.similarity_threshold = similarity_threshold
 
     def lookup(self, text: str, glossary_targets: list[str] | None = None):
-        exact = self.database.get_exact(text, self.source_lang, self.target_lang)
-        if exact and all(target in exact for target in (glossary_targets or [])):
-            return exact
-        if not text.strip():
-            return None
-        db = self.database._connect()
-        try:
-            rows = db.execute("SELECT source_text, translated_text FROM translations WHERE source_lang=? AND target_lang=?", (self.source_lang, self.target_lang)).fetchall()
-        finally:
-            db.close()
+        return self.lookup_many([text], [glossary_targets])[0]
+
+    def lookup_many(self, texts: list[str], glossary_targets: list[list[str] | None] | None = None) -> list[str | None]:
+        targets = glossary_targets or [None] * len(texts)
+        exact = self.database.get_exact_many(texts, self.source_lang, self.target_lang)
+        results = [exact[text] if exact[text] and self._covers(exact[text], required) else None for text, required in zip(texts, targets)]
+        fuzzy = [text for text, result in zip(texts, results) if result is None and text.strip()]
+        if not fuzzy:
+            return results
+        candidates = self.database.fuzzy_candidates_many(fuzzy, self.source_lang, self.target_lang, self.similarity_threshold)
+        for index, (text, required) in enumerate(zip(texts, targets)):
+            if text in candidates and results[index] is None:
+                results[index] = self._best(text, candidates[text], required)
+        return results
+
+    def _best(self, text, rows, glossary_targets):
         normalized = text.strip().lower()
         for source, translation in rows:
-            if SequenceMatcher(None, normalized, source.strip().lower()).ratio() >= self.similarity_threshold and all(target in translation for target in (glossary_targets or [])):
+            if SequenceMatcher(None, normalized, source.strip().lower()).ratio() >= self.similarity_threshold and self._covers(translation, glossary_targets):
                 return translation
         return None
 
+    @staticmethod
+    def _covers(translation, glossary_targets):
+        return all(target in translation for target in (glossary_targets or []))
+
     def save(self, source: str, translation: str):
         self.database.put(source, translation, self.source_lang, self.target_lang)
+
+    def save_many(self, pairs: list[tuple[str, str]]):
+        self.database.put_many(pairs, self.source_lang, self.target_lang)
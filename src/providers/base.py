@@ -1,8 +1,66 @@
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
 from typing import Any
+import httpx
+from openai import APIConnectionError
 
 
 class LLMProvider(ABC):
+    max_connections: int = 32
+    token_budget: int = 4096
+    response_format: str = "json"
+    structured_output: bool = False
+
     @abstractmethod
-    def chat(self, messages: list[dict[str, str]], temperature: float = 0.2) -> str:
+    def chat(self, messages: list[dict[str, str]], temperature: float = 0.2, schema: dict | None = None) -> str:
         raise NotImplementedError
+
+    async def achat(self, messages: list[dict[str, str]], temperature: float = 0.2, schema: dict | None = None) -> str:
+        # schema is only passed when set, so subclasses written against the older
+        # chat(messages, temperature) signature keep working.
+        options = {"schema": schema} if schema is not None else {}
+        return await asyncio.to_thread(self.chat, messages, temperature, **options)
+
+    async def astream(self, messages: list[dict[str, str]], temperature: float = 0.2, schema: dict | None = None):
+        options = {"schema": schema} if schema is not None else {}
+        yield await self.achat(messages, temperature, **options)
+
+    def _async_client(self, factory) -> Any:
+        # HTTP connection pools belong to the event loop that opened them, so
+        # keep one keep-alive client per running loop. Each translate_document call
+        # runs its own loop, so connections are pooled within a job, not across jobs.
+        clients = self.__dict__.setdefault("_async_clients", weakref.WeakKeyDictionary())
+        loop = asyncio.get_running_loop()
+        if loop not in clients:
+            clients[loop] = factory()
+        return clients[loop]
+
+
+def schema_rejected(message) -> bool:
+    message = str(message or "").lower()
+    return "schema" in message or "format" in message
+
+
+def transient_error(exc) -> bool:
+    # Dropped connections, timeouts, rate limits and server errors may succeed on a retry.
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(exc, (TimeoutError, ConnectionError, httpx.TransportError, APIConnectionError))
+
+
+async def achat(provider, messages: list[dict[str, str]], temperature: float = 0.2, schema: dict | None = None) -> str:
+    options = {"schema": schema} if schema is not None and getattr(provider, "structured_output", False) else {}
+    if hasattr(provider, "achat"):
+        return await provider.achat(messages, temperature=temperature, **options)
+    return await asyncio.to_thread(provider.chat, messages, temperature=temperature, **options)
+
+
+async def astream(provider, messages: list[dict[str, str]], temperature: float = 0.2, schema: dict | None = None):
+    if not hasattr(provider, "astream"):
+        yield await achat(provider, messages, temperature, schema)
+        return
+    options = {"schema": schema} if schema is not None and getattr(provider, "structured_output", False) else {}
+    async for chunk in provider.astream(messages, temperature=temperature, **options):
+        yield chunk
@@ -2,5 +2,5 @@ from .openai_compatible import OpenAICompatibleProvider
 
 
 class LMStudioProvider(OpenAICompatibleProvider):
-    def __init__(self, model: str = "local-model", base_url: str = "http://localhost:1234/v1"):
-        super().__init__(model=model, base_url=base_url, api_key="lm-studio")
+    def __init__(self, model: str = "local-model", base_url: str = "http://localhost:1234/v1", response_format: str = "json"):
+        super().__init__(model=model, base_url=base_url, api_key="lm-studio", response_format=response_format)
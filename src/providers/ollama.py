@@ -1,11 +1,58 @@
-from ollama import chat as ollama_chat
-from .base import LLMProvider
+import httpx
+from ollama import AsyncClient, Client, ResponseError
+from .base import LLMProvider, schema_rejected
 
 
 class OllamaProvider(LLMProvider):
-    def __init__(self, model: str):
+    def __init__(self, model: str, host: str | None = None, response_format: str = "json", structured_output: bool = True):
         self.model = model
+        self.host = host
+        self.response_format = response_format
+        self.structured_output = structured_output
+        self.client = Client(host=host)
 
-    def chat(self, messages, temperature=0.2):
-        response = ollama_chat(model=self.model, messages=messages, options={"temperature": temperature})
+    def chat(self, messages, temperature=0.2, schema=None):
+        try:
+            response = self.client.chat(model=self.model, messages=messages, options={"temperature": temperature}, **self._format(schema))
+        except ResponseError as exc:
+            if not self._rejected(schema, exc):
+                raise
+            response = self.client.chat(model=self.model, messages=messages, options={"temperature": temperature})
         return response.message.content or ""
+
+    async def achat(self, messages, temperature=0.2, schema=None):
+        client = self._aclient()
+        try:
+            response = await client.chat(model=self.model, messages=messages, options={"temperature": temperature}, **self._format(schema))
+        except ResponseError as exc:
+            if not self._rejected(schema, exc):
+                raise
+            response = await client.chat(model=self.model, messages=messages, options={"temperature": temperature})
+        return response.message.content or ""
+
+    async def astream(self, messages, temperature=0.2, schema=None):
+        client = self._aclient()
+        started = False
+        try:
+            async for chunk in await client.chat(model=self.model, messages=messages, options={"temperature": temperature}, stream=True, **self._format(schema)):
+                started = True
+                yield chunk.message.content or ""
+        except ResponseError as exc:
+            if started or not self._rejected(schema, exc):
+                raise
+            async for chunk in await client.chat(model=self.model, messages=messages, options={"temperature": temperature}, stream=True):
+                yield chunk.message.content or ""
+
+    def _aclient(self):
+        return self._async_client(lambda: AsyncClient(host=self.host, limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)))
+
+    def _format(self, schema):
+        return {"format": schema} if schema is not None and self.structured_output else {}
+
+    def _rejected(self, schema, exc):
+        # Servers that predate schema formats answer 400 about the format; stop asking
+        # and retry plainly. Other bad requests (e.g. context length) are real errors.
+        if schema is None or not self.structured_output or exc.status_code not in {400, 422} or not schema_rejected(exc.error):
+            return False
+        self.structured_output = False
+        return True
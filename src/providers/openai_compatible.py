@@ -1,14 +1,75 @@
-from openai import OpenAI
-from .base import LLMProvider
+import httpx
+from openai import AsyncOpenAI, BadRequestError, OpenAI, UnprocessableEntityError
+from .base import LLMProvider, schema_rejected
 
 
 class OpenAICompatibleProvider(LLMProvider):
-    def __init__(self, model: str, base_url: str, api_key: str = ""):
+    def __init__(self, model: str, base_url: str, api_key: str = "", response_format: str = "json", structured_output: bool = True):
         self.model = model
-        self.client = OpenAI(base_url=base_url.rstrip("/"), api_key=api_key or "not-needed")
+        self.response_format = response_format
+        self.structured_output = structured_output
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key or "not-needed"
+        self.client = OpenAI(base_url=self.base_url, api_key=self.api_key)
 
-    def chat(self, messages, temperature=0.2):
-        response = self.client.chat.completions.create(
-            model=self.model, messages=messages, temperature=temperature
-        )
+    def chat(self, messages, temperature=0.2, schema=None):
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature, **self._format(schema)
+            )
+        except (BadRequestError, UnprocessableEntityError) as exc:
+            if not self._rejected(schema, exc):
+                raise
+            response = self.client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature
+            )
         return response.choices[0].message.content or ""
+
+    async def achat(self, messages, temperature=0.2, schema=None):
+        client = self._aclient()
+        try:
+            response = await client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature, **self._format(schema)
+            )
+        except (BadRequestError, UnprocessableEntityError) as exc:
+            if not self._rejected(schema, exc):
+                raise
+            response = await client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature
+            )
+        return response.choices[0].message.content or ""
+
+    async def astream(self, messages, temperature=0.2, schema=None):
+        client = self._aclient()
+        try:
+            stream = await client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature, stream=True, **self._format(schema)
+            )
+        except (BadRequestError, UnprocessableEntityError) as exc:
+            if not self._rejected(schema, exc):
+                raise
+            stream = await client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature, stream=True
+            )
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    def _aclient(self):
+        return self._async_client(lambda: AsyncOpenAI(
+            base_url=self.base_url, api_key=self.api_key,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)),
+        ))
+
+    def _format(self, schema):
+        if schema is None or not self.structured_output:
+            return {}
+        return {"response_format": {"type": "json_schema", "json_schema": {"name": "translations", "schema": schema}}}
+
+    def _rejected(self, schema, exc):
+        # Servers without json_schema support reject the request; stop asking and retry
+        # plainly. Other bad requests (e.g. context length) are real errors.
+        if schema is None or not self.structured_output or not (exc.param == "response_format" or schema_rejected(exc.message)):
+            return False
+        self.structured_output = False
+        return True
@@ -0,0 +1,3 @@
+from .sqlite import SQLiteStore
+
+__all__ = ["SQLiteStore"]
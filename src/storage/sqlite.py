@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class _Connection(sqlite3.Connection):
+    # A subclass can be weakly referenced, so the store tracks connections without keeping them alive.
+    pass
+
+
+class SQLiteStore:
+    def __init__(self, path: str | Path, synchronous: str = "NORMAL", busy_timeout: float = 30.0, cached_statements: int = 256):
+        if synchronous.upper() not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            raise ValueError("synchronous must be OFF, NORMAL, FULL, or EXTRA")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.synchronous = synchronous.upper()
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        # Only thread-local storage owns a connection; it is freed, and so closed, when
+        # its thread exits, which matters for the short-lived executor threads of each job.
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False, cached_statements=self.cached_statements, factory=_Connection)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.db = db
+            with self._lock:
+                self._connections.add(db)
+        return db
+
+    @contextmanager
+    def transaction(self):
+        db = self.connection()
+        if db.in_transaction:
+            yield db
+            return
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            for db in list(self._connections):
+                db.close()
+            self._connections = weakref.WeakSet()
+            self._local = threading.local()
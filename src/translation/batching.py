@@ -0,0 +1,63 @@
+DEFAULT_TOKEN_BUDGET = 4096
+MIN_UNIT_TOKENS = 16
+
+
+def estimate_tokens(unit) -> int:
+    # Roughly four characters per prompt token for subtitle text plus the JSON
+    # framing of each item; translated output is budgeted at two characters per
+    # token because Persian and other non-Latin scripts tokenize less densely.
+    prompt = len(unit.text) + sum(len(entry.source) + len(entry.target) + len(entry.description or "") for entry in (unit.glossary or []))
+    return prompt // 4 + len(unit.text) // 2 + MIN_UNIT_TOKENS
+
+
+def context_tokens(first, last=None) -> int:
+    # Context lines are shared across a contiguous batch: it carries the lines
+    # before its first unit and after its last, once.
+    last = last or first
+    lines = (first.context.previous if first.context else []) + (last.context.next if last.context else [])
+    return sum(len(line) for line in lines) // 4
+
+
+class TokenBudgetBatcher:
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, max_units: int = 20, failure_limit: int = 2):
+        if token_budget < 1 or max_units < 1 or failure_limit < 1:
+            raise ValueError("token_budget, max_units and failure_limit must be positive")
+        self.token_budget = token_budget
+        self.max_units = max_units
+        self.failure_limit = failure_limit
+        self.failures = 0
+
+    def pack(self, units) -> list[list]:
+        batches, batch, tokens = [], [], 0
+        for unit in units:
+            cost = estimate_tokens(unit)
+            if batch and (len(batch) >= self.max_units or tokens + cost + context_tokens(batch[0], unit) > self.token_budget):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(unit)
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def take(self, pending, final: bool = False) -> tuple[list[list], list]:
+        batches = self.pack(pending)
+        if final or not batches or self.full(batches[-1]):
+            return batches, []
+        # Only a trailing batch with room left waits for the next chunk's units.
+        return batches[:-1], batches[-1]
+
+    def full(self, batch) -> bool:
+        tokens = sum(estimate_tokens(unit) for unit in batch) + context_tokens(batch[0], batch[-1])
+        return len(batch) >= self.max_units or tokens + MIN_UNIT_TOKENS > self.token_budget
+
+    def record_failure(self, size: int):
+        # Whole batches that keep failing are probably too large for this model:
+        # after failure_limit in a row, cap every later batch of the job at half the size.
+        self.failures += 1
+        if self.failures >= self.failure_limit:
+            self.max_units = max(1, min(self.max_units, size // 2))
+            self.failures = 0
+
+    def record_success(self):
+        self.failures = 0
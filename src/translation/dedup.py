@@ -0,0 +1,25 @@
+from .models import TranslationUnit
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def dedup_key(unit: TranslationUnit, mode: str) -> tuple:
+    key = (normalize_text(unit.text), tuple(entry.target for entry in (unit.glossary or [])))
+    if mode == "context" and unit.context:
+        # Only the adjacent lines count; a full window almost never repeats.
+        key += (tuple(normalize_text(text) for text in unit.context.previous[-1:]), tuple(normalize_text(text) for text in unit.context.next[:1]))
+    return key
+
+
+def deduplicate(units: list[TranslationUnit], mode: str = "text") -> tuple[list[TranslationUnit], dict[int, list[int]]]:
+    if mode == "off":
+        return units, {}
+    first = {}
+    copies = {}
+    for unit in units:
+        representative = first.setdefault(dedup_key(unit, mode), unit)
+        if representative is not unit:
+            copies.setdefault(representative.id, []).append(unit.id)
+    return list(first.values()), copies
@@ -6,16 +6,24 @@ from src.translation.validator import validate_glossary
 from src.memory.service import TranslationMemory
 from src.evaluation.judge import TranslationJudge
 from src.evaluation.database import EvaluationDatabase
+from src.evaluation.heuristics import screen_translation
+from src.evaluation.sampling import SampledReview
 from src.jobs.database import JobDatabase
 from src.translation.config import TranslationConfig
-from src.translation.workers import TranslationWorker
+from src.translation.workers import AdaptiveLimiter, TranslationWorker
+from src.translation.batching import DEFAULT_TOKEN_BUDGET, TokenBudgetBatcher, estimate_tokens
 import asyncio
-from src.translation.prompts import batch_messages
-from src.translation.validator import validate_translations
+import time
+from collections import Counter
+from src.translation.prompts import batch_messages, correction_messages, translation_schema
+from src.providers.base import achat, astream, transient_error
+from src.translation.streaming import StreamParser
+from src.translation.dedup import deduplicate
+from src.translation.validator import parse_translations, salvage_translations
 
 
 class SubtitleTranslator:
-    def __init__(self, batch_size: int = 20, max_retries: int = 2, context_mode: str = "window", context_window: int = 3, glossary_path=None, glossary=None, memory=None, memory_path=None, judge=None, quality_mode: str = "disabled", evaluation_path=None, max_workers: int = 1):
+    def __init__(self, batch_size: int = 20, max_retries: int = 2, context_mode: str = "window", context_window: int = 3, glossary_path=None, glossary=None, memory=None, memory_path=None, judge=None, quality_mode: str = "disabled", evaluation_path=None, max_workers: int = 1, scheduler=None, concurrency_mode: str = "async", token_budget: int | None = None, response_format: str | None = None, streaming: bool = False, deduplicate: str = "text", target_language: str = "fa", sample_rate: float = 0.1, escalation_threshold: float = 0.2, evaluations=None):
         if batch_size < 1:
             raise ValueError("batch_size must be positive")
         self.batch_size = batch_size
@@ -26,14 +34,34 @@ class SubtitleTranslator:
         self.context_builder = ContextBuilder(context_window)
         self.glossary = glossary or GlossaryService(path=glossary_path) if glossary_path else (glossary or GlossaryService())
         self.memory = memory if memory is not None else (TranslationMemory(memory_path) if memory_path else None)
-        if quality_mode not in {"disabled", "fast", "standard", "strict"}:
-            raise ValueError("quality_mode must be disabled, fast, standard, or strict")
+        if quality_mode not in {"disabled", "fast", "sampled", "standard", "strict"}:
+            raise ValueError("quality_mode must be disabled, fast, sampled, standard, or strict")
         self.quality_mode = quality_mode
+        self.sampler = SampledReview(sample_rate, escalation_threshold) if quality_mode == "sampled" else None
         self.judge = judge
-        self.evaluations = EvaluationDatabase(evaluation_path) if evaluation_path else None
+        self.evaluations = evaluations if evaluations is not None else (EvaluationDatabase(evaluation_path) if evaluation_path else None)
+        if self.evaluations and judge is not None and getattr(judge, "cache", False) is None:
+            # Scores persist next to the evaluations, so resumed or repeated jobs skip the judge.
+            judge.cache = self.evaluations
         if max_workers < 1:
             raise ValueError("max_workers must be positive")
         self.max_workers = max_workers
+        self.scheduler = scheduler
+        if concurrency_mode not in {"async", "adaptive"}:
+            raise ValueError("concurrency_mode must be 'async' or 'adaptive'")
+        self.concurrency_mode = concurrency_mode
+        if token_budget is not None and token_budget < 1:
+            raise ValueError("token_budget must be positive")
+        self.token_budget = token_budget
+        if response_format not in {None, "json", "lines"}:
+            raise ValueError("response_format must be 'json' or 'lines'")
+        self.response_format = response_format
+        self.repairs = Counter()
+        self.streaming = streaming
+        if deduplicate not in {"off", "text", "context"}:
+            raise ValueError("deduplicate must be 'off', 'text' or 'context'")
+        self.deduplicate = deduplicate
+        self.target_language = target_language
 
     def extract_units(self, document) -> list[TranslationUnit]:
         return [TranslationUnit(
@@ -43,22 +71,179 @@ class SubtitleTranslator:
             glossary=self.glossary.find_terms(line.text),
         ) for i, line in enumerate(document.subtitles)]
 
-    def _translate_batch(self, units, provider):
+    async def _translate_batch(self, units, provider, batcher=None, depth=0, on_items=None, isolated=None, limiter=None):
+        if depth > 0 and len(units) == 1 and isolated is not None:
+            isolated.append(units[0].id)
+        if batcher and len(units) > batcher.max_units:
+            result = {}
+            for part in batcher.pack(units):
+                result.update(await self._translate_batch(part, provider, batcher, depth, on_items, isolated, limiter))
+            return result
+        result = {}
+        remaining = units
         last_error = None
-        for _ in range(self.max_retries + 1):
+        response_format = self.response_format or getattr(provider, "response_format", "json")
+        # Split halves get a single attempt so a bad line is isolated in O(log n) calls;
+        # the whole batch and the final single line get the full retry budget.
+        attempts = self.max_retries + 1 if depth == 0 or len(units) == 1 else 1
+        for attempt in range(attempts):
+            raw = None
             try:
-                raw = provider.chat(batch_messages(units), temperature=0.2)
-                result = validate_translations(raw, [unit.id for unit in units])
-                validate_glossary(result, {unit.id: [entry.target for entry in (unit.glossary or [])] for unit in units})
+                schema = translation_schema([unit.id for unit in remaining]) if response_format == "json" else None
+                # Only the provider call is timed, per estimated token, for the adaptive limiter.
+                started = time.monotonic()
+                if self.streaming:
+                    raw = await self._stream(provider, remaining, response_format, schema, result, on_items)
+                else:
+                    raw = await achat(provider, batch_messages(remaining, response_format), temperature=0.2, schema=schema)
+                latency = (time.monotonic() - started) / max(1, sum(estimate_tokens(unit) for unit in remaining))
+                repairs = []
+                translated = parse_translations(raw, [unit.id for unit in remaining], response_format, repairs)
+                validate_glossary(translated, self._glossary_targets(remaining))
+                self.repairs.update(repairs)
+                result.update(translated)
+                if batcher and depth == 0:
+                    batcher.record_success()
+                if limiter:
+                    limiter.observe(latency)
                 return result
             except (ValueError, TypeError) as exc:
                 last_error = exc
-        if len(units) > 1:
-            result = {}
-            for unit in units:
-                result.update(self._translate_batch([unit], provider))
+                if limiter:
+                    limiter.observe(0.0, failed=True)
+                if raw is not None:
+                    result.update(self._salvage(raw, remaining, response_format))
+                remaining = [unit for unit in remaining if unit.id not in result]
+                if not remaining:
+                    return result
+            except Exception as exc:
+                # Transient provider errors back the limiter off and use the retry budget;
+                # bisecting would not help, so the last one fails the batch.
+                if not transient_error(exc):
+                    raise
+                if limiter:
+                    limiter.observe(0.0, failed=True)
+                if attempt == attempts - 1:
+                    raise
+        if len(remaining) > 1:
+            middle = len(remaining) // 2
+            singles = []
+            for half in (remaining[:middle], remaining[middle:]):
+                result.update(await self._translate_batch(half, provider, batcher, depth + 1, on_items, singles, limiter))
+            # Only a top-level batch whose halves succeeded without narrowing the
+            # failure down to one line says the batch size itself is the problem.
+            if batcher and depth == 0 and not singles:
+                batcher.record_failure(len(units))
+            if isolated is not None:
+                isolated.extend(singles)
             return result
-        raise ValueError(f"Unable to validate translation for subtitle {units[0].id}: {last_error}")
+        raise ValueError(f"Unable to validate translation for subtitle {remaining[0].id}: {last_error}")
+
+    async def _stream(self, provider, units, response_format, schema, result, on_items):
+        parser = StreamParser([unit.id for unit in units], response_format)
+        targets = self._glossary_targets(units)
+        try:
+            async for chunk in astream(provider, batch_messages(units, response_format), temperature=0.2, schema=schema):
+                items = {unit_id: text for unit_id, text in parser.feed(chunk).items() if all(target in text for target in targets[unit_id])}
+                result.update(items)
+                if items and on_items:
+                    on_items(items)
+        except Exception as exc:
+            # A stream that breaks after delivering lines only costs the unfinished ones.
+            if not result.keys() & parser.expected_ids:
+                raise
+            raise ValueError(f"Stream interrupted: {exc}") from exc
+        return parser.text
+
+    @staticmethod
+    def _glossary_targets(units):
+        return {unit.id: [entry.target for entry in (unit.glossary or [])] for unit in units}
+
+    def _salvage(self, raw, units, response_format="json"):
+        salvaged = salvage_translations(raw, [unit.id for unit in units], response_format)
+        targets = self._glossary_targets(units)
+        return {unit_id: text for unit_id, text in salvaged.items() if all(target in text for target in targets[unit_id])}
+
+    def _lookup_memory(self, units):
+        hits = self.memory.lookup_many([unit.text for unit in units], [[entry.target for entry in (unit.glossary or [])] for unit in units]) if self.memory else [None] * len(units)
+        return {unit.id: hit for unit, hit in zip(units, hits) if hit is not None}
+
+    @staticmethod
+    def _record(items, translations, jobs, job_id, copies):
+        # Duplicate lines share their representative's translation and checkpoint.
+        items = dict(items)
+        for unit_id, text in list(items.items()):
+            items.update(dict.fromkeys(copies.get(unit_id, ()), text))
+        translations.update(items)
+        if jobs:
+            jobs.writer.submit(job_id, items)
+
+    async def _review_batch(self, batch, result, provider, job_id=None):
+        if self.quality_mode == "fast":
+            # Only lines that fail the local checks are worth a judge call.
+            batch = [unit for unit in batch if screen_translation(unit.text, result[unit.id], self.target_language, [e.target for e in (unit.glossary or [])])]
+        started = time.perf_counter()
+        sample = self.sampler.sample(batch) if self.sampler else batch
+        scores = await self._judge(sample, result)
+        if self.sampler:
+            self.sampler.record(scores.values())
+        if scores and self.evaluations:
+            model = getattr(getattr(self.judge, "provider", None), "model", None)
+            await asyncio.to_thread(self.evaluations.save_many, scores, job_id, model, (time.perf_counter() - started) / len(scores))
+        failed = [unit for unit in batch if unit.id in scores and not scores[unit.id].passed]
+        if failed and self.quality_mode in {"sampled", "standard", "strict"}:
+            result.update(await self._correct(failed, result, {unit.id: scores[unit.id].issues for unit in failed}, provider))
+        return result
+
+    async def _judge(self, units, result):
+        if not units:
+            return {}
+        return await self.judge.aevaluate_batch([{"id": unit.id, "source": unit.text, "translation": result[unit.id], "glossary": [e.target for e in (unit.glossary or [])]} for unit in units])
+
+    async def _correct(self, units, drafts, issues, provider):
+        # All failed lines of a batch are corrected in one call and go through the
+        # same validation as translations; lines that still fail keep their draft.
+        response_format = self.response_format or getattr(provider, "response_format", "json")
+        ids = [unit.id for unit in units]
+        schema = translation_schema(ids) if response_format == "json" else None
+        raw = await achat(provider, correction_messages(units, drafts, issues, response_format), temperature=0.1, schema=schema)
+        try:
+            corrected = parse_translations(raw, ids, response_format)
+            validate_glossary(corrected, self._glossary_targets(units))
+        except (ValueError, TypeError):
+            corrected = self._salvage(raw, units, response_format)
+        return {unit_id: text for unit_id, text in corrected.items() if text.strip()}
+
+    def _finish_batch(self, batch, result):
+        if self.memory:
+            self.memory.save_many([(unit.text, result[unit.id]) for unit in batch])
+        return {unit.id: result[unit.id] for unit in batch}
+
+    async def _run_batch(self, worker, batch, provider, translations, jobs, job_id, copies):
+        result = await worker.translate(batch, lambda items: self._record(items, translations, jobs, job_id, copies))
+        if self.judge and self.quality_mode != "disabled":
+            result = await worker.review(batch, result, job_id)
+        self._record(await asyncio.to_thread(self._finish_batch, batch, result), translations, jobs, job_id, copies)
+
+    async def _run_pipeline(self, units, provider, translations, jobs, job_id, copies=None):
+        # Each batch is dispatched as soon as its memory lookups resolve and is judged,
+        # stored and checkpointed as soon as it returns, while later lookups continue.
+        limiter = AdaptiveLimiter(self.max_workers) if self.concurrency_mode == "adaptive" else asyncio.Semaphore(self.max_workers)
+        batcher = TokenBudgetBatcher(self.token_budget or getattr(provider, "token_budget", DEFAULT_TOKEN_BUDGET), self.batch_size)
+        cancelled = (lambda: jobs.get(job_id)["status"] == "cancelled") if jobs else None
+        worker = TranslationWorker(self, provider, limiter, self.scheduler, job_id if job_id is not None else id(units), batcher, cancelled)
+        tasks = []
+        pending = []
+        for start in range(0, len(units), self.batch_size):
+            chunk = units[start:start + self.batch_size]
+            cached = await asyncio.to_thread(self._lookup_memory, chunk)
+            self._record(cached, translations, jobs, job_id, copies or {})
+            batches, pending = batcher.take(pending + [unit for unit in chunk if unit.id not in cached], final=start + self.batch_size >= len(units))
+            for batch in batches:
+                tasks.append(asyncio.create_task(self._run_batch(worker, batch, provider, translations, jobs, job_id, copies or {})))
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                raise result
 
     def translate_document(self, document, provider, job_id=None, source_file="", output_file="", job_database=None):
         units = self.extract_units(document)
@@ -66,50 +251,19 @@ class SubtitleTranslator:
         checkpoints = {}
         jobs = job_database or (JobDatabase() if job_id else None)
         if jobs and job_id:
-            if not jobs.checkpoints(job_id):
+            # Queued jobs already have a row holding their request; only bare runs create one.
+            if jobs.get(job_id):
+                jobs.set_status(job_id, "running")
+            else:
                 jobs.create(job_id, source_file, output_file, len(units))
             checkpoints = jobs.checkpoints(job_id)
             translations.update(checkpoints)
-        pending = []
-        for unit in units:
-            if unit.id in checkpoints:
-                continue
-            cached = self.memory.lookup(unit.text, [entry.target for entry in (unit.glossary or [])]) if self.memory else None
-            if cached is not None:
-                translations[unit.id] = cached
-                if jobs and job_id:
-                    jobs.save_checkpoint(job_id, unit.id, cached)
-            else:
-                pending.append(unit)
-        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
-        if self.max_workers > 1 and batches:
-            async def run_batches():
-                semaphore = asyncio.Semaphore(self.max_workers)
-                worker = TranslationWorker(self, provider, semaphore)
-                return await asyncio.gather(*(worker.translate(batch) for batch in batches), return_exceptions=True)
-            batch_results = asyncio.run(run_batches())
-        else:
-            batch_results = [self._translate_batch(batch, provider) for batch in batches]
-        for batch, result in zip(batches, batch_results):
-            if isinstance(result, Exception):
-                raise result
-            if self.judge and self.quality_mode != "disabled":
-                for unit in batch:
-                    score = self.judge.evaluate(unit.text, result[unit.id], glossary=[e.target for e in (unit.glossary or [])])
-                    if self.evaluations:
-                        self.evaluations.save(unit.id, score)
-                    if not score.passed and self.quality_mode in {"standard", "strict"}:
-                        retry = [dict(role="system", content="Correct the translation using these review issues: " + "; ".join(score.issues)), dict(role="user", content=unit.text)]
-                        corrected = provider.chat(retry, temperature=0.1)
-                        if corrected.strip():
-                            result[unit.id] = corrected.strip()
-            translations.update(result)
-            if self.memory:
-                for unit in batch:
-                    self.memory.save(unit.text, result[unit.id])
+        remaining, copies = deduplicate([unit for unit in units if unit.id not in checkpoints], self.deduplicate)
+        try:
+            asyncio.run(self._run_pipeline(remaining, provider, translations, jobs if job_id else None, job_id, copies))
+        finally:
             if jobs and job_id:
-                for unit in batch:
-                    jobs.save_checkpoint(job_id, unit.id, result[unit.id])
+                jobs.writer.flush(job_id)
         if jobs and job_id:
             jobs.set_status(job_id, "completed")
         result = deepcopy(document)
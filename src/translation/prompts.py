@@ -3,19 +3,66 @@ import json
 
 SYSTEM_PROMPT = """You translate subtitle text. Return JSON only as an array of objects with exactly these keys: id and translation.
 Translate only the text represented by each item. Never modify IDs, timestamps, formatting, or add explanations."""
+LINES_SYSTEM_PROMPT = """You translate subtitle text. Return one line per item formatted exactly as id|translation, with no other text.
+Translate only the text represented by each item. Never modify IDs, timestamps, formatting, or add explanations."""
 
 
-def batch_messages(units) -> list[dict[str, str]]:
-    payload = []
+def batch_payload(units) -> dict:
+    # Context windows of neighbouring units overlap, so every subtitle line in the
+    # span is sent once and items point at their own line by index.
+    lines = {}
+    for unit in units:
+        lines[unit.id] = unit.text
+        if unit.context:
+            for offset, text in enumerate(reversed(unit.context.previous), 1):
+                lines.setdefault(unit.id - offset, text)
+            for offset, text in enumerate(unit.context.next, 1):
+                lines.setdefault(unit.id + offset, text)
+    order = sorted(lines)
+    index = {line_id: position for position, line_id in enumerate(order)}
+    glossary = {}
     for unit in units:
-        context = unit.context
-        glossary = [{"source": entry.source, "target": entry.target, "description": entry.description} for entry in (unit.glossary or [])]
-        payload.append({"id": unit.id, "context": {
-            "previous": context.previous if context else [],
-            "current": context.current if context else unit.text,
-            "next": context.next if context else [],
-        }, "text": unit.text, "glossary": glossary})
+        for entry in unit.glossary or []:
+            glossary.setdefault((entry.source, entry.target), {"source": entry.source, "target": entry.target, "description": entry.description})
+    return {
+        "lines": [lines[line_id] for line_id in order],
+        "items": [{"id": unit.id, "line": index[unit.id]} for unit in units],
+        "glossary": list(glossary.values()),
+    }
+
+
+def batch_messages(units, response_format: str = "json") -> list[dict[str, str]]:
+    return _messages(batch_payload(units), response_format, "Translate the line of each item")
+
+
+def correction_messages(units, drafts: dict[int, str], issues: dict[int, list[str]], response_format: str = "json") -> list[dict[str, str]]:
+    payload = batch_payload(units)
+    for item in payload["items"]:
+        item["draft"] = drafts[item["id"]]
+        item["issues"] = issues[item["id"]]
+    return _messages(payload, response_format, "Each item has a draft translation and the reviewer's issues. Correct the draft of each item")
+
+
+def _messages(payload, response_format, instruction):
+    system, output = (LINES_SYSTEM_PROMPT, "id|translation lines") if response_format == "lines" else (SYSTEM_PROMPT, "JSON")
     return [
-        {"role": "system", "content": SYSTEM_PROMPT + " Use previous and next lines only for pronouns, jokes, intent, and references. Do not translate context. Follow every glossary mapping exactly, preserve names, and return only JSON."},
-        {"role": "user", "content": "Translate these subtitle text fields and return JSON only:\n" + json.dumps(payload, ensure_ascii=False)},
+        {"role": "system", "content": system + f" The input has lines (consecutive subtitle lines), items (each id with the index of its line in lines), and glossary. Translate lines[line] for every item. Use the other lines only for pronouns, jokes, intent, and references. Do not translate context. Follow every glossary mapping exactly, preserve names, and return only {output}."},
+        {"role": "user", "content": f"{instruction} and return {output} only:\n" + json.dumps(payload, ensure_ascii=False)},
     ]
+
+
+def translation_schema(ids: list[int]) -> dict:
+    # Structured-output APIs require an object at the root, so the array is wrapped
+    # as {"translations": [...]}; the validator unwraps it.
+    return {
+        "type": "object",
+        "properties": {"translations": {
+            "type": "array", "minItems": len(ids), "maxItems": len(ids),
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer", "enum": list(ids)}, "translation": {"type": "string"}},
+                "required": ["id", "translation"], "additionalProperties": False,
+            },
+        }},
+        "required": ["translations"], "additionalProperties": False,
+    }
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+
+class ProviderScheduler:
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.active = 0
+        self._waiting = OrderedDict()
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, job_id):
+        await self.acquire(job_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, job_id):
+        # Jobs run on their own event loops in separate threads, so waiters are
+        # futures woken with call_soon_threadsafe, and jobs are served round-robin.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiting:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiting.setdefault(job_id, deque()).append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queue = self._waiting.get(job_id)
+                queued = queue is not None and waiter in queue
+                if queued:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._waiting[job_id]
+            if not queued and waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            while self.active < self.limit and self._waiting:
+                job_id, queue = self._waiting.popitem(last=False)
+                loop, future = queue.popleft()
+                if queue:
+                    self._waiting[job_id] = queue
+                self.active += 1
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                except RuntimeError:
+                    self.active -= 1
+
+    def _grant(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+_schedulers: dict[tuple, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_for(provider, limit: int) -> ProviderScheduler:
+    key = (type(provider).__name__, getattr(provider, "base_url", getattr(provider, "host", None)), getattr(provider, "model", None))
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = ProviderScheduler(limit)
+        return _schedulers[key]
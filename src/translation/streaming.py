@@ -0,0 +1,66 @@
+import json
+from .validator import LINE_ITEM
+
+
+class StreamParser:
+    # Emits each {"id", "translation"} item (or id|translation line) as soon as it is
+    # complete, so a batch can be checkpointed while the model is still generating.
+    def __init__(self, expected_ids: list[int], response_format: str = "json"):
+        self.expected_ids = set(expected_ids)
+        self.response_format = response_format
+        self.text = ""
+        self.seen = set()
+        self._position = 0
+        self._starts = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> dict[int, str]:
+        self.text += chunk
+        if self.response_format == "lines":
+            return self._feed_lines()
+        return self._feed_json()
+
+    def _feed_lines(self):
+        items = {}
+        end = self.text.rfind("\n")
+        if end < self._position:
+            return items
+        for line in self.text[self._position:end].splitlines():
+            match = LINE_ITEM.fullmatch(line.strip())
+            if match:
+                self._accept(items, int(match.group(1)), match.group(2))
+        self._position = end + 1
+        return items
+
+    def _feed_json(self):
+        # Items are the innermost complete objects with id and translation, whether
+        # the reply is a bare array or wrapped as {"translations": [...]}.
+        items = {}
+        for index in range(self._position, len(self.text)):
+            char = self.text[index]
+            if self._in_string:
+                self._in_string = self._escaped or char != '"'
+                self._escaped = not self._escaped and char == "\\"
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._starts.append(index)
+            elif char == "}" and self._starts:
+                try:
+                    item = json.loads(self.text[self._starts.pop():index + 1])
+                except json.JSONDecodeError:
+                    item = None
+                if isinstance(item, dict) and set(item) == {"id", "translation"} and isinstance(item["id"], int) and isinstance(item["translation"], str):
+                    self._accept(items, item["id"], item["translation"])
+        self._position = len(self.text)
+        return items
+
+    def _accept(self, items, unit_id, translation):
+        # Only the first sighting of an expected id is emitted, and the engine
+        # checkpoints it at once. If the model repeats the id, strict validation of
+        # the full response fails, but that first copy stays in the batch result:
+        # it is neither retried nor replaced by the later copy.
+        if unit_id in self.expected_ids and unit_id not in self.seen:
+            items[unit_id] = translation
+        self.seen.add(unit_id)
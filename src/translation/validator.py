@@ -1,11 +1,71 @@
 import json
+import re
+from collections import Counter
 
+LINE_ITEM = re.compile(r"(\d+)\|(.*)")
+FENCE = re.compile(r"```[\w-]*[ \t]*\n?(.*?)\n?[ \t]*```", re.S)
 
-def validate_translations(raw: str, expected_ids: list[int]) -> dict[int, str]:
+
+def _strip_fence(raw: str, repairs: list[str]) -> str:
+    match = FENCE.search(raw)
+    if not match:
+        return raw
+    repairs.append("fence")
+    return match.group(1)
+
+
+def _drop_trailing_commas(text: str) -> str:
+    out = []
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            in_string = escaped or char != '"'
+            escaped = not escaped and char == "\\"
+        elif char == '"':
+            in_string = True
+        elif char == "," and text[index + 1:].lstrip()[:1] in {"]", "}"}:
+            continue
+        out.append(char)
+    return "".join(out)
+
+
+def _unwrap(payload):
+    # Schema-constrained replies carry the array as {"translations": [...]}.
+    if isinstance(payload, dict) and set(payload) == {"translations"}:
+        return payload["translations"]
+    return payload
+
+
+def extract_json(raw: str, repairs: list[str] | None = None):
+    # Local models wrap otherwise valid arrays in fences, preambles and trailing
+    # commas; repairing them here is far cheaper than another provider round trip.
+    repairs = [] if repairs is None else repairs
+    try:
+        return _unwrap(json.loads(raw))
+    except json.JSONDecodeError:
+        pass
+    text = _strip_fence(raw, repairs).strip()
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("Provider returned invalid JSON")
+    if start > 0 or end < len(text) - 1:
+        repairs.append("surrounding_text")
+    text = text[start:end + 1]
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    repaired = _drop_trailing_commas(text)
     try:
-        payload = json.loads(raw)
+        payload = json.loads(repaired)
     except json.JSONDecodeError as exc:
         raise ValueError("Provider returned invalid JSON") from exc
+    repairs.append("trailing_comma")
+    return payload
+
+
+def validate_translations(raw: str, expected_ids: list[int], repairs: list[str] | None = None) -> dict[int, str]:
+    payload = extract_json(raw, repairs)
     if not isinstance(payload, list) or len(payload) != len(expected_ids):
         raise ValueError("Translation count does not match input batch")
     result = {}
@@ -22,6 +82,50 @@ def validate_translations(raw: str, expected_ids: list[int]) -> dict[int, str]:
     return result
 
 
+def validate_line_translations(raw: str, expected_ids: list[int], repairs: list[str] | None = None) -> dict[int, str]:
+    repairs = [] if repairs is None else repairs
+    lines = [line for line in _strip_fence(raw, repairs).strip().splitlines() if line.strip()]
+    if lines and not LINE_ITEM.fullmatch(lines[0].strip()) and len(lines) == len(expected_ids) + 1:
+        repairs.append("surrounding_text")
+        lines = lines[1:]
+    if len(lines) != len(expected_ids):
+        raise ValueError("Translation count does not match input batch")
+    result = {}
+    for line in lines:
+        match = LINE_ITEM.fullmatch(line.strip())
+        if not match:
+            raise ValueError("Each translation line must be formatted as id|translation")
+        unit_id = int(match.group(1))
+        if unit_id in result or unit_id not in expected_ids:
+            raise ValueError("Translation IDs do not match input batch")
+        result[unit_id] = match.group(2)
+    if set(result) != set(expected_ids):
+        raise ValueError("Translation IDs do not match input batch")
+    return result
+
+
+def parse_translations(raw: str, expected_ids: list[int], response_format: str = "json", repairs: list[str] | None = None) -> dict[int, str]:
+    if response_format == "lines":
+        return validate_line_translations(raw, expected_ids, repairs)
+    return validate_translations(raw, expected_ids, repairs)
+
+
+def salvage_translations(raw: str, expected_ids: list[int], response_format: str = "json") -> dict[int, str]:
+    if response_format == "lines":
+        matches = [LINE_ITEM.fullmatch(line.strip()) for line in raw.splitlines()]
+        items = [{"id": int(match.group(1)), "translation": match.group(2)} for match in matches if match]
+    else:
+        try:
+            payload = extract_json(raw)
+        except ValueError:
+            return {}
+        if not isinstance(payload, list):
+            return {}
+        items = [item for item in payload if isinstance(item, dict) and set(item) == {"id", "translation"} and isinstance(item["id"], int) and isinstance(item["translation"], str)]
+    counts = Counter(item["id"] for item in items)
+    return {item["id"]: item["translation"] for item in items if item["id"] in expected_ids and counts[item["id"]] == 1}
+
+
 def validate_glossary(translations: dict[int, str], required: dict[int, list[str]]) -> None:
     for unit_id, targets in required.items():
         missing = [target for target in targets if target not in translations[unit_id]]
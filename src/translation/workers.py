@@ -1,12 +1,81 @@
 import asyncio
+from contextlib import asynccontextmanager
+from src.jobs.database import JobCancelled
 
 
 class TranslationWorker:
-    def __init__(self, translator, provider, semaphore):
+    def __init__(self, translator, provider, semaphore, scheduler=None, job_id=None, batcher=None, cancelled=None):
         self.translator = translator
         self.provider = provider
         self.semaphore = semaphore
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.batcher = batcher
+        self.cancelled = cancelled
 
-    async def translate(self, batch):
+    async def translate(self, batch, on_items=None):
+        async with self._slot():
+            # Checked once a slot is free, so batches waiting on the limiter stop too.
+            if self.cancelled and await asyncio.to_thread(self.cancelled):
+                raise JobCancelled(self.job_id)
+            # The adaptive limiter is fed per provider call, so retries and failed
+            # validations count while scheduler waits and the checks above do not.
+            limiter = self.semaphore if isinstance(self.semaphore, AdaptiveLimiter) else None
+            return await self.translator._translate_batch(batch, self.provider, self.batcher, on_items=on_items, limiter=limiter)
+
+    async def review(self, batch, result, job_id=None):
+        # Review shares the provider slots, so judging one batch overlaps with
+        # translating the next instead of waiting for the whole document.
+        async with self._slot():
+            return await self.translator._review_batch(batch, result, self.provider, job_id)
+
+    @asynccontextmanager
+    async def _slot(self):
         async with self.semaphore:
-            return await asyncio.to_thread(self.translator._translate_batch, batch, self.provider)
+            if self.scheduler is None:
+                yield
+            else:
+                async with self.scheduler.slot(self.job_id):
+                    yield
+
+
+class AdaptiveLimiter:
+    def __init__(self, ceiling: int, initial: int = 1, tolerance: float = 1.5, decrease: float = 0.9, backoff: float = 0.5, drift: float = 0.001):
+        if ceiling < 1:
+            raise ValueError("ceiling must be positive")
+        self.ceiling = ceiling
+        self.limit = float(max(1, min(initial, ceiling)))
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.backoff = backoff
+        self.drift = drift
+        self.baseline = None
+        self.active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def observe(self, latency: float, failed: bool = False):
+        # Callers report each provider call, with latency per estimated token so batches
+        # of different sizes compare fairly. AIMD: grow by about one slot per window of successes while latency stays
+        # within tolerance of the best seen, back off when it does not or on failure.
+        if failed:
+            self.limit = max(1.0, self.limit * self.backoff)
+            return
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # Let the baseline drift up slowly so one lucky fast batch does not pin it.
+            self.baseline += (latency - self.baseline) * self.drift
+        if latency <= self.baseline * self.tolerance:
+            self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+        else:
+            self.limit = max(1.0, self.limit * self.decrease)
@@ -0,0 +1,35 @@
+import asyncio
+import gc
+import os
+import tempfile
+import threading
+from pathlib import Path
+from src.storage import SQLiteStore
+
+
+def open_files():
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0
+
+
+with tempfile.TemporaryDirectory() as directory:
+    store = SQLiteStore(Path(directory) / "store.db")
+    assert store.connection() is store.connection() and store.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    async def job():
+        # Each asyncio.run gets a fresh default executor, as every translation job does.
+        await asyncio.gather(*(asyncio.to_thread(lambda: store.connection().execute("SELECT 1").fetchone()) for _ in range(4)))
+
+    asyncio.run(job())
+    gc.collect()
+    before = open_files()
+    for _ in range(20):
+        asyncio.run(job())
+    gc.collect()
+    # Connections of exited executor threads are closed rather than kept forever.
+    assert len(store._connections) <= 5 and open_files() <= before + 3
+    thread = threading.Thread(target=store.connection)
+    thread.start()
+    thread.join()
+    store.close()
+    assert len(store._connections) == 0
+print("sqlite store check passed")
@@ -0,0 +1,63 @@
+import json
+import tempfile
+from pathlib import Path
+from src.jobs.database import JobDatabase
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.streaming import StreamParser
+
+parser = StreamParser([1, 2, 3])
+raw = '```json\n[{"id": 1, "translation": "a } ]"}, {"id": 2, "translation": "b\\"{"}, {"id": 9, "translation": "x"}, {"id": 3'
+emitted = {}
+for start in range(0, len(raw), 4):
+    emitted.update(parser.feed(raw[start:start + 4]))
+assert emitted == {1: "a } ]", 2: 'b"{'}
+lines = StreamParser([1, 2], "lines")
+assert lines.feed("1|a\n2|") == {1: "a"} and lines.feed("b") == {} and lines.feed("\n") == {2: "b"}
+
+
+class Provider:
+    def __init__(self):
+        self.requests = []
+
+    def chat(self, messages, temperature=0.2):
+        raise AssertionError("streaming providers are read through astream")
+
+    async def astream(self, messages, temperature=0.2):
+        ids = [x["id"] for x in json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]]
+        self.requests.append(ids)
+        raw = json.dumps([{"id": i, "translation": f"T{i}"} for i in ids])
+        for start in range(0, len(raw), 7):
+            if len(self.requests) == 1 and start > len(raw) // 2:
+                raise ConnectionError("stream dropped")
+            yield raw[start:start + 7]
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(6)), encoding="utf-8")
+    jobs = JobDatabase(Path(directory) / "jobs.db")
+    submitted = []
+    submit = jobs.writer.submit
+    jobs.writer.submit = lambda job_id, items: (submitted.append(sorted(items)), submit(job_id, items))
+    provider = Provider()
+    result = SubtitleTranslator(batch_size=6, streaming=True).translate_document(SubtitleDocument.load(path), provider, job_id="stream", job_database=jobs)
+    assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(6)]
+    # Lines completed before the stream dropped were kept; only the rest were requested again.
+    assert provider.requests[0] == list(range(6)) and len(provider.requests) == 2
+    assert set(provider.requests[1]) < set(range(6)) and 0 not in provider.requests[1]
+    assert submitted[0] == [] and len(submitted[1]) == 1
+    assert jobs.get("stream")["completed_units"] == 6
+
+    class RepeatingProvider(Provider):
+        async def astream(self, messages, temperature=0.2):
+            ids = [x["id"] for x in json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]]
+            self.requests.append(ids)
+            yield json.dumps([{"id": i, "translation": f"T{i}"} for i in ids] + [{"id": 0, "translation": "again"}])
+
+    # A repeated id keeps its first, already checkpointed copy and is not requested again.
+    provider = RepeatingProvider()
+    result = SubtitleTranslator(batch_size=6, streaming=True).translate_document(SubtitleDocument.load(path), provider, job_id="repeat", job_database=jobs)
+    assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(6)] and len(provider.requests) == 1
+    assert jobs.checkpoints("repeat")[0] == "T0"
+print("streaming check passed")
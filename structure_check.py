@@ -7,8 +7,9 @@ from src.translation.engine import SubtitleTranslator
 class FakeProvider:
     def chat(self, messages, temperature=0.2):
         import json
-        items = json.loads(messages[-1]["content"].split("\n", 1)[1])
-        assert items[0]["context"]["current"] == "Hello world"
+        payload = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        items = payload["items"]
+        assert payload["lines"][items[0]["line"]] == "Hello world"
         return json.dumps([{"id": item["id"], "translation": "سلام دنیا"} for item in items], ensure_ascii=False)
 
 
@@ -25,3 +26,18 @@ with tempfile.TemporaryDirectory() as directory:
     assert original.subtitles[0].start == translated.subtitles[0].start
     assert original.subtitles[0].end == translated.subtitles[0].end
 print("structure-aware translation check passed")
+
+from src.glossary.models import GlossaryEntry
+from src.translation.context import ContextBuilder
+from src.translation.models import TranslationUnit
+from src.translation.prompts import batch_payload
+
+lines = [type("Line", (), {"text": f"Rick line {i}"})() for i in range(60)]
+rick = GlossaryEntry("Rick", "ریک")
+units = [TranslationUnit(i, lines[i].text, ContextBuilder(3).build(lines, i), [rick]) for i in range(20, 40)]
+payload = batch_payload(units)
+# Each line of the 3-line context window is sent once, not once per unit.
+assert payload["lines"] == [f"Rick line {i}" for i in range(17, 43)]
+assert [payload["lines"][item["line"]] for item in payload["items"]] == [unit.text for unit in units]
+assert payload["glossary"] == [{"source": "Rick", "target": "ریک", "description": None}]
+print("shared batch context check passed")
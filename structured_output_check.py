@@ -0,0 +1,101 @@
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+import httpx
+from ollama import ResponseError
+from openai import BadRequestError, OpenAI
+from src.providers.base import LLMProvider
+from src.providers.ollama import OllamaProvider
+from src.providers.openai_compatible import OpenAICompatibleProvider
+from src.subtitle_engine import SubtitleDocument
+from src.translation.engine import SubtitleTranslator
+from src.translation.prompts import translation_schema
+from src.translation.streaming import StreamParser
+from src.translation.validator import validate_translations
+
+schema = translation_schema([3, 4])
+assert schema["type"] == "object" and schema["required"] == ["translations"]
+array = schema["properties"]["translations"]
+assert array["minItems"] == array["maxItems"] == 2 and array["items"]["properties"]["id"]["enum"] == [3, 4]
+assert validate_translations('{"translations": [{"id": 3, "translation": "a"}, {"id": 4, "translation": "b"}]}', [3, 4]) == {3: "a", 4: "b"}
+parser = StreamParser([3, 4])
+assert parser.feed('{"translations": [{"id": 3, "translation": "a"}, {"id"') == {3: "a"} and parser.feed(': 4, "translation": "b"}]}') == {4: "b"}
+
+
+class Client:
+    def __init__(self, supports_schema):
+        self.supports_schema = supports_schema
+        self.formats = []
+
+    def chat(self, model, messages, options, format=None):
+        self.formats.append(format)
+        if format is not None and not self.supports_schema:
+            raise ResponseError("unsupported format", 400)
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        translations = [{"id": x["id"], "translation": f"T{x['id']}"} for x in items]
+        if format is not None:
+            assert sorted(format["properties"]["translations"]["items"]["properties"]["id"]["enum"]) == sorted(x["id"] for x in items)
+            return SimpleNamespace(message=SimpleNamespace(content=json.dumps({"translations": translations})))
+        return SimpleNamespace(message=SimpleNamespace(content=json.dumps(translations)))
+
+
+class Provider(OllamaProvider):
+    async def achat(self, messages, temperature=0.2, schema=None):
+        return self.chat(messages, temperature, schema)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "many.srt"
+    path.write_text("\n\n".join(f"{i}\n00:00:00,000 --> 00:00:01,000\nLine {i}" for i in range(12)), encoding="utf-8")
+    for supports_schema in (True, False):
+        provider = Provider("model")
+        provider.client = Client(supports_schema)
+        result = SubtitleTranslator(batch_size=5).translate_document(SubtitleDocument.load(path), provider)
+        assert [line.text for line in result.subtitles] == [f"T{i}" for i in range(12)]
+        assert provider.structured_output is supports_schema
+        # An unsupported server is asked for a schema once, then only plain JSON.
+        assert sum(format is not None for format in provider.client.formats) == (3 if supports_schema else 1)
+
+# A context-length 400 is a real error and must not switch structured output off.
+provider = Provider("model")
+provider.client = SimpleNamespace(chat=lambda **kwargs: (_ for _ in ()).throw(ResponseError("prompt is too long for the context window", 400)))
+try:
+    provider.chat([{"role": "user", "content": "x"}], schema=schema)
+    raise AssertionError("context errors must propagate")
+except ResponseError:
+    assert provider.structured_output
+
+
+def openai_server(request):
+    body = json.loads(request.content)
+    if "prompt" in body["messages"][-1]["content"]:
+        return httpx.Response(400, json={"error": {"message": "This model's maximum context length is 8192 tokens.", "type": "invalid_request_error", "param": "messages", "code": "context_length_exceeded"}})
+    assert body["response_format"]["json_schema"]["schema"]["type"] == "object"
+    return httpx.Response(200, json={"id": "1", "object": "chat.completion", "created": 0, "model": "m", "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": '{"translations": []}'}}]})
+
+
+provider = OpenAICompatibleProvider("m", "http://server/v1")
+provider.client = OpenAI(base_url="http://server/v1", api_key="x", http_client=httpx.Client(transport=httpx.MockTransport(openai_server)))
+assert provider.chat([{"role": "user", "content": "hi"}], schema=schema) == '{"translations": []}'
+try:
+    provider.chat([{"role": "user", "content": "prompt"}], schema=schema)
+    raise AssertionError("context errors must propagate")
+except BadRequestError:
+    assert provider.structured_output
+
+
+class LegacyProvider(LLMProvider):
+    # Written against the original chat(messages, temperature) signature.
+    def chat(self, messages, temperature=0.2):
+        items = json.loads(messages[-1]["content"].split("\n", 1)[1])["items"]
+        return json.dumps([{"id": x["id"], "translation": f"T{x['id']}"} for x in items])
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / "two.srt"
+    path.write_text("1\n00:00:00,000 --> 00:00:01,000\nLine 0\n\n2\n00:00:01,000 --> 00:00:02,000\nLine 1", encoding="utf-8")
+    for streaming in (False, True):
+        result = SubtitleTranslator(streaming=streaming).translate_document(SubtitleDocument.load(path), LegacyProvider())
+        assert [line.text for line in result.subtitles] == ["T0", "T1"]
+print("structured output check passed")